@@ -1,3 +1,11 @@
 from .ldtk import LDtk, read_LDtk
-from .defs import TileSet, Enum, EnumValue, Defs
+from .defs import TileSet, Enum, EnumValue, Defs, LayerDefinition
 from .levels import Level, FieldInstance, TileInstance, LayerInstance, EntityInstance
+from .world import WorldScene
+from .atlas import PackedAtlas
+from .entities import EntitySpriteFactory
+from .masks import TileMasks
+from .changes import ChangeLog
+from .lod import LevelThumbnails
+from .raycast import IntGridRaycaster, RayHit
+from .graph import LevelGraph, LevelEdge
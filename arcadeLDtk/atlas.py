@@ -0,0 +1,221 @@
+from dataclasses import dataclass, field, replace
+from typing import TYPE_CHECKING, Any, Optional, Self
+import json
+import os.path
+
+import arcade
+import PIL.Image
+
+if TYPE_CHECKING:
+    from . import LDtk
+
+from .defs import TileRect
+
+
+TileKey = tuple[int, int]
+"(tileset uid, tile id)"
+RectKey = tuple[int, int, int, int, int]
+"(tileset uid, x, y, w, h)"
+Region = tuple[int, int, int, int, int]
+"(page, x, y, w, h)"
+
+
+def rect_key(rect: TileRect) -> RectKey:
+    return (rect["tilesetUid"], rect["x"], rect["y"], rect["w"], rect["h"])
+
+
+def used_tiles(ldtk: "LDtk") -> set[TileKey]:
+    """Return the tiles used by a layer of any level"""
+    used: set[TileKey] = set()
+    for level in ldtk.levels:
+        for layer in level.layers:
+            if layer.tileset is not None and layer.has_tiles():
+                used.update((layer.tileset.uid, t.tile_id) for t in layer.tiles())
+    return used
+
+
+def used_rects(ldtk: "LDtk") -> set[RectKey]:
+    """Return the tile rects used by entity and enum definitions"""
+    rects: list[Optional[TileRect]] = []
+    for entity in { e.uid: e for e in ldtk.defs.entities.values() }.values():
+        rects.append(entity.tile_rect)
+        rects.append(entity.ui_tile_rect)
+    for enum in { e.uid: e for e in ldtk.defs.enums.values() }.values():
+        rects.extend(v.tile_rect for v in enum.values.values())
+    return { rect_key(r) for r in rects if r and r["tilesetUid"] in ldtk.defs.tilesets }
+
+
+def pack_shelves(sizes: dict[str, tuple[int, int]], max_size: int, padding: int = 0) -> tuple[dict[str, Region], list[tuple[int, int]]]:
+    """Place rectangles of the given sizes on pages of at most max_size x max_size pixels,
+    with padding pixels around each of them. Return the region of each rectangle, in
+    placement order, and the size of each page.
+
+    Rectangles go by decreasing height on the first shelf with room for them, like
+    the allocator of arcade atlases: adding them in the same order to an atlas of
+    the page size and with a border of padding fills it the same way."""
+    regions: dict[str, Region] = {}
+    pages: list[tuple[int, int]] = []
+    shelves: list[list[int]] = []
+    "[y, height, x] of the shelves of the current page"
+    page = width = 0
+
+    for name, (w, h) in sorted(sizes.items(), key=lambda item: (item[1][1], item[1][0]), reverse=True):
+        pw, ph = w + 2 * padding, h + 2 * padding
+        if pw > max_size or ph > max_size:
+            raise ValueError(f"a {w}x{h} texture does not fit in a {max_size} atlas")
+        shelf = next((s for s in shelves if s[2] + pw <= max_size and s[1] >= ph), None)
+        if shelf is None:
+            y = shelves[-1][0] + shelves[-1][1] if shelves else 0
+            if y + ph > max_size:
+                pages.append((width, y))
+                page, width, shelves, y = page + 1, 0, [], 0
+            shelf = [y, ph, 0]
+            shelves.append(shelf)
+        y, _, x = shelf
+        regions[name] = (page, x + padding, y + padding, w, h)
+        shelf[2] += pw
+        width = max(width, shelf[2])
+
+    if regions:
+        pages.append((width, shelves[-1][0] + shelves[-1][1]))
+    return regions, pages
+
+
+@dataclass(slots=True, kw_only=True)
+class PackedAtlas:
+    """Only the textures used by a project, packed in a few images of bounded size.
+
+    Identical images are stored once. Flipped tiles are not stored: arcade flips
+    textures when drawing them, so they share the image of the unflipped tile."""
+
+    pages: list[PIL.Image.Image]
+    regions: dict[str, Region]
+    """image hash to its place in the pages"""
+    tiles: dict[TileKey, str]
+    """tile to its image hash"""
+    rects: dict[RectKey, str]
+    """tile rect to its image hash"""
+    border: int = 2
+    """free pixels around each image, the border of the arcade atlases"""
+
+    _textures: dict[str, arcade.Texture] = field(default_factory=dict)
+
+    @classmethod
+    def from_ldtk(cls, ldtk: "LDtk", max_size: int = 2048, border: int = 2) -> Self:
+        images: dict[str, PIL.Image.Image] = {}
+
+        def add(texture: arcade.Texture) -> str:
+            hash = texture.image_data.hash
+            images.setdefault(hash, texture.image)
+            return hash
+
+        tiles = { (uid, id): add(ldtk.defs.tilesets[uid][id]) for uid, id in used_tiles(ldtk) }
+        rects: dict[RectKey, str] = {}
+        for key in used_rects(ldtk):
+            uid, x, y, w, h = key
+            rects[key] = add(ldtk.defs.tilesets[uid].get_texture({ "tilesetUid": uid, "x": x, "y": y, "w": w, "h": h }))
+
+        regions, sizes = pack_shelves({ hash: image.size for hash, image in images.items() }, max_size, border)
+        pages = [PIL.Image.new("RGBA", size, (0, 0, 0, 0)) for size in sizes]
+        for hash, (page, x, y, _, _) in regions.items():
+            pages[page].paste(images[hash], (x, y))
+
+        return cls(pages=pages, regions=regions, tiles=tiles, rects=rects, border=border)
+
+    def texture(self, hash: str) -> arcade.Texture:
+        texture = self._textures.get(hash)
+        if texture is None:
+            page, x, y, w, h = self.regions[hash]
+            texture = arcade.Texture(self.pages[page].crop((x, y, x + w, y + h)), hash=hash)
+            self._textures[hash] = texture
+        return texture
+
+    def get_tile(self, tileset_uid: int, tile_id: int) -> Optional[arcade.Texture]:
+        hash = self.tiles.get((tileset_uid, tile_id))
+        return self.texture(hash) if hash is not None else None
+
+    def get_texture(self, rect: TileRect) -> Optional[arcade.Texture]:
+        hash = self.rects.get(rect_key(rect))
+        return self.texture(hash) if hash is not None else None
+
+    def _remap(self, rect: Optional[TileRect], texture: Optional[arcade.Texture]) -> Optional[arcade.Texture]:
+        if rect is None:
+            return texture
+        return self.get_texture(rect) or texture
+
+    def apply(self, ldtk: "LDtk"):
+        """Make ldtk use the packed textures for every tile and tile rect in the atlas"""
+        tilesets = { ts.uid: ts for ts in ldtk.defs.tilesets.values() }
+        for (uid, id) in self.tiles:
+            if uid in tilesets:
+                tilesets[uid].set[id] = self.get_tile(uid, id) # type: ignore
+        for ts in tilesets.values():
+            ts._flipped.clear()
+
+        entities = {}
+        for key, entity in ldtk.defs.entities.items():
+            new = entities.get(entity.uid)
+            if new is None:
+                new = entities[entity.uid] = replace(
+                    entity,
+                    tile = self._remap(entity.tile_rect, entity.tile),
+                    ui_tile = self._remap(entity.ui_tile_rect, entity.ui_tile)
+                )
+            ldtk.defs.entities[key] = new
+
+        for enum in { e.uid: e for e in ldtk.defs.enums.values() }.values():
+            for id, value in enum.values.items():
+                if value.tile_rect:
+                    enum.values[id] = replace(value, tile=self._remap(value.tile_rect, value.tile))
+
+        for level in ldtk.levels:
+            for layer in level.layers:
+                for e in layer.entity_list:
+                    e.def_ = entities[e.def_uid]
+                if layer.has_tiles():
+                    layer.reload_textures()
+
+    def make_texture_atlases(self, ctx: Optional[arcade.ArcadeContext] = None) -> list[arcade.DefaultTextureAtlas]:
+        """Return one arcade atlas per page, holding the textures of the page.
+        They can be given to SpriteList, so each list draws from a small atlas.
+        Textures are added in packing order, so they fit without resizing the atlas"""
+        atlases = []
+        for number, page in enumerate(self.pages):
+            textures = [self.texture(hash) for hash, region in self.regions.items() if region[0] == number]
+            atlases.append(arcade.DefaultTextureAtlas(page.size, border=self.border, textures=textures, ctx=ctx))
+        return atlases
+
+    def save(self, path: str):
+        """Save the atlas as path.json and one path_<n>.png per page"""
+        for number, page in enumerate(self.pages):
+            page.save(f"{path}_{number}.png")
+        index: dict[str, Any] = {
+            "pages": len(self.pages),
+            "border": self.border,
+            "regions": self.regions,
+            "tiles": [[uid, id, hash] for (uid, id), hash in self.tiles.items()],
+            "rects": [[*key, hash] for key, hash in self.rects.items()]
+        }
+        with open(f"{path}.json", "w") as f:
+            json.dump(index, f)
+
+    @classmethod
+    def load(cls, path: str) -> Self:
+        with open(f"{path}.json") as f:
+            index = json.load(f)
+        return cls(
+            pages = [PIL.Image.open(f"{path}_{number}.png").convert("RGBA") for number in range(index["pages"])],
+            regions = { hash: tuple(region) for hash, region in index["regions"].items() },
+            tiles = { (uid, id): hash for uid, id, hash in index["tiles"] },
+            rects = { (uid, x, y, w, h): hash for uid, x, y, w, h, hash in index["rects"] },
+            border = index["border"]
+        )
+
+    @classmethod
+    def load_or_pack(cls, ldtk: "LDtk", path: str, max_size: int = 2048, border: int = 2) -> Self:
+        """Load the atlas saved at path, packing and saving it first if needed"""
+        if os.path.exists(f"{path}.json"):
+            return cls.load(path)
+        new = cls.from_ldtk(ldtk, max_size, border)
+        new.save(path)
+        return new
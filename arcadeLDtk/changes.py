@@ -0,0 +1,174 @@
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Optional
+import json
+import struct
+import zlib
+
+import arcade
+
+if TYPE_CHECKING:
+    from . import LDtk
+
+
+MAGIC = b"LDtkDelta\x02"
+
+TileKey = tuple[str, int, int]
+"(layer iid, cx, cy)"
+TileValue = Optional[tuple[int, bool, bool, float]]
+"(tile id, flip x, flip y, alpha), or None for a cleared cell"
+
+_COUNT = struct.Struct("<I")
+_STRING = struct.Struct("<I")
+_TILE = struct.Struct("<IiiiBd")
+_INT_GRID = struct.Struct("<Iiii")
+_ADDED = struct.Struct("<IIIii")
+_MOVED = struct.Struct("<Idd")
+_REMOVED = struct.Struct("<I")
+_FIELD = struct.Struct("<IIII")
+
+
+def field_from_json(type: str, value: Any) -> Any:
+    """Convert back a field value saved as json"""
+    if value is None:
+        return None
+    match type:
+        case "Color":
+            return arcade.types.Color(*value)
+        case "Point":
+            return tuple(value)
+        case "Array<Point>":
+            return [tuple(pt) for pt in value]
+        case _:
+            return value
+
+
+@dataclass(slots=True)
+class ChangeLog:
+    """Changes made to a project since it was loaded, by iid.
+
+    Only the last state of each changed cell, entity or field is kept, so its
+    size depends on what was changed, not on how many times or on the world size."""
+
+    tiles: dict[TileKey, TileValue] = field(default_factory=dict)
+    int_grid: dict[TileKey, int] = field(default_factory=dict)
+    added: dict[str, tuple[str, str, int, int]] = field(default_factory=dict)
+    "entity iid to (layer iid, identifier, width, height) of added entities"
+    moved: dict[str, tuple[float, float]] = field(default_factory=dict)
+    "entity iid to its position, in level arcade coordinates"
+    removed: set[str] = field(default_factory=set)
+    fields: dict[tuple[str, str], tuple[str, Any]] = field(default_factory=dict)
+    "(owner iid, field identifier) to (type, value)"
+
+    def __len__(self) -> int:
+        return len(self.tiles) + len(self.int_grid) + len(self.added) + len(self.moved) + len(self.removed) + len(self.fields)
+
+    def clear(self):
+        self.tiles.clear()
+        self.int_grid.clear()
+        self.added.clear()
+        self.moved.clear()
+        self.removed.clear()
+        self.fields.clear()
+
+    def remove_entity(self, iid: str):
+        self.moved.pop(iid, None)
+        for key in [key for key in self.fields if key[0] == iid]:
+            del self.fields[key]
+        if self.added.pop(iid, None) is None:
+            self.removed.add(iid)
+
+    def to_bytes(self) -> bytes:
+        strings: dict[str, int] = {}
+
+        def ref(s: str) -> int:
+            return strings.setdefault(s, len(strings))
+
+        body = bytearray()
+
+        def records(st: struct.Struct, rows: list[tuple]):
+            body.extend(_COUNT.pack(len(rows)))
+            for row in rows:
+                body.extend(st.pack(*row))
+
+        records(_TILE, [
+            (ref(layer), cx, cy, -1, 0, 0.0) if tile is None
+            else (ref(layer), cx, cy, tile[0], tile[1] | tile[2] << 1, tile[3])
+            for (layer, cx, cy), tile in self.tiles.items()
+        ])
+        records(_INT_GRID, [(ref(layer), cx, cy, value) for (layer, cx, cy), value in self.int_grid.items()])
+        records(_ADDED, [(ref(iid), ref(layer), ref(identifier), w, h) for iid, (layer, identifier, w, h) in self.added.items()])
+        records(_MOVED, [(ref(iid), x, y) for iid, (x, y) in self.moved.items()])
+        records(_REMOVED, [(ref(iid),) for iid in sorted(self.removed)])
+        records(_FIELD, [
+            (ref(owner), ref(identifier), ref(type), ref(json.dumps(value, separators=(",", ":"))))
+            for (owner, identifier), (type, value) in self.fields.items()
+        ])
+
+        table = bytearray(_COUNT.pack(len(strings)))
+        for s in strings:
+            data = s.encode()
+            table.extend(_STRING.pack(len(data)))
+            table.extend(data)
+
+        return MAGIC + zlib.compress(bytes(table + body))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "ChangeLog":
+        if not data.startswith(MAGIC):
+            raise ValueError("not a ldtk delta")
+        payload = memoryview(zlib.decompress(data[len(MAGIC):]))
+        offset = 0
+
+        def read(st: struct.Struct) -> tuple:
+            nonlocal offset
+            row = st.unpack_from(payload, offset)
+            offset += st.size
+            return row
+
+        strings = []
+        for _ in range(read(_COUNT)[0]):
+            size, = read(_STRING)
+            strings.append(bytes(payload[offset:offset + size]).decode())
+            offset += size
+
+        def rows(st: struct.Struct) -> list[tuple]:
+            return [read(st) for _ in range(read(_COUNT)[0])]
+
+        new = cls()
+        for layer, cx, cy, tile_id, flags, alpha in rows(_TILE):
+            new.tiles[(strings[layer], cx, cy)] = None if tile_id < 0 else (tile_id, bool(flags & 1), bool(flags & 2), alpha)
+        for layer, cx, cy, value in rows(_INT_GRID):
+            new.int_grid[(strings[layer], cx, cy)] = value
+        for iid, layer, identifier, w, h in rows(_ADDED):
+            new.added[strings[iid]] = (strings[layer], strings[identifier], w, h)
+        for iid, x, y in rows(_MOVED):
+            new.moved[strings[iid]] = (x, y)
+        for iid, in rows(_REMOVED):
+            new.removed.add(strings[iid])
+        for owner, identifier, type, value in rows(_FIELD):
+            new.fields[(strings[owner], strings[identifier])] = (strings[type], field_from_json(strings[type], json.loads(strings[value])))
+        return new
+
+    def apply(self, ldtk: "LDtk"):
+        """Redo the changes on ldtk, they are recorded again in ldtk.changes"""
+        for iid, (layer_iid, identifier, width, height) in self.added.items():
+            x, y = self.moved[iid]
+            ldtk.layers_by_iid[layer_iid].add_entity(identifier, x, y, width=width, height=height, iid=iid)
+        for iid, (x, y) in self.moved.items():
+            if iid not in self.added:
+                entity = ldtk.entity_by_iid[iid]
+                entity.parent.move_entity(entity, x, y)
+        for (owner, identifier), (type, value) in self.fields.items():
+            target = ldtk.entity_by_iid[owner] if owner in ldtk.entity_by_iid else ldtk.levels_by_iid[owner]
+            target.set_field(identifier, value, type)
+        for iid in self.removed:
+            entity = ldtk.entity_by_iid[iid]
+            entity.parent.remove_entity(entity)
+        for (layer_iid, cx, cy), tile in self.tiles.items():
+            layer = ldtk.layers_by_iid[layer_iid]
+            if tile is None:
+                layer.clear_tile(cx, cy)
+            else:
+                layer.set_tile(cx, cy, *tile)
+        for (layer_iid, cx, cy), value in self.int_grid.items():
+            ldtk.layers_by_iid[layer_iid].set_int_grid(cx, cy, value)
@@ -1,5 +1,5 @@
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import os
 from typing import Any, Optional, Self
 from typing import TypedDict
@@ -62,6 +62,12 @@ class TileSet:
 
     path: str
 
+    tile_tags: dict[int, list[str]] = field(default_factory=dict)
+    "dict from texture id to its tags"
+
+    _flipped: dict[tuple[int, bool, bool], arcade.Texture] = field(default_factory=dict)
+    """cache of flipped textures, by (tile id, flip x, flip y)"""
+
     @classmethod
     def from_json(cls, path:str, ts:dict[str, Any]) -> Self:
         if ts["embedAtlas"] is not None:
@@ -86,10 +92,30 @@ class TileSet:
             li = new.custom_data.setdefault(data["tileId"], [])
             li.append(data["data"])
 
+        for tag, ids in new.enum_tag.items():
+            for id in ids:
+                new.tile_tags.setdefault(id, []).append(tag)
+
         return new
 
     def __getitem__(self, id: int) -> arcade.Texture:
         return self.set[id]
+
+    def get_tile(self, id: int, flip_x: bool = False, flip_y: bool = False) -> arcade.Texture:
+        """Return the texture of tile id, flipped as asked.
+        Flipped textures are cached so they are shared by every tile using them"""
+        if not (flip_x or flip_y):
+            return self.set[id]
+        key = (id, flip_x, flip_y)
+        texture = self._flipped.get(key)
+        if texture is None:
+            texture = self.set[id]
+            if flip_x:
+                texture = texture.flip_horizontally()
+            if flip_y:
+                texture = texture.flip_vertically()
+            self._flipped[key] = texture
+        return texture
     
     def get_texture(self, rect:TileRect) -> arcade.Texture:
         return self.sprite_sheet.get_texture(tile_rect_to_rect(rect))
@@ -136,6 +162,7 @@ class Enum:
 class EntityDefinition:
     uid: int
     identifier: str
+    tags: list[str]
     color: arcade.types.Color
     height: int
     width: int
@@ -154,6 +181,7 @@ class EntityDefinition:
         new = cls(
             uid = ts["uid"],
             identifier = ts["identifier"],
+            tags = ts["tags"],
             color = ts["color"],
             height = ts["height"],
             width = ts["width"],
@@ -170,6 +198,28 @@ class EntityDefinition:
         return new
 
 
+@dataclass(slots=True, frozen=True, kw_only=True)
+class LayerDefinition:
+    uid: int
+    identifier: str
+    type: str
+    grid_size: int
+    int_grid_colors: dict[int, arcade.types.Color]
+    """dict from IntGrid value to its color"""
+
+    @classmethod
+    def from_json(cls, ts:dict[str, Any]) -> Self:
+        return cls(
+            uid = ts["uid"],
+            identifier = ts["identifier"],
+            type = ts["type"],
+            grid_size = ts["gridSize"],
+            int_grid_colors = {
+                v["value"]: arcade.types.Color.from_hex_string(v["color"]) for v in ts["intGridValues"]
+            }
+        )
+
+
 @dataclass(slots=True, frozen=True, kw_only=True)
 class Defs:
     tilesets : dict[int|str, TileSet]
@@ -177,13 +227,15 @@ class Defs:
     enums: dict[int|str, Enum]
     """merge of enums and externalenums"""
     entities: dict[int|str, EntityDefinition]
+    layers: dict[int|str, LayerDefinition]
 
     @classmethod
     def from_json(cls, path:str, dict:dict[str, Any]) -> Self:
         new = cls(
             tilesets = { },
             enums = { },
-            entities = { }
+            entities = { },
+            layers = { }
         )
         for ts in dict["tilesets"]:
             if "identifier" in ts and ts["identifier"] == 'Internal_Icons':
@@ -203,6 +255,11 @@ class Defs:
             new.enums[enum.uid] = enum
             new.enums[enum.identifier] = enum
 
+        for la in dict["layers"]:
+            layer = LayerDefinition.from_json(la)
+            new.layers[layer.uid] = layer
+            new.layers[layer.identifier] = layer
+
         for ent in dict["entities"]:
             entity = EntityDefinition.from_json(ent, new)
             new.entities[entity.uid] = entity
@@ -0,0 +1,145 @@
+from typing import Callable, Iterable, Optional
+
+import arcade
+import PIL.Image
+
+from .levels import EntityInstance, LayerInstance
+
+
+TextureKey = tuple[str, str, int, int]
+"(render mode, image hash or color, with the crop position if any, width, height)"
+
+
+def repeat_image(image: PIL.Image.Image, width: int, height: int) -> PIL.Image.Image:
+    """Tile image over a width x height image"""
+    new = PIL.Image.new("RGBA", (width, height), (0, 0, 0, 0))
+    for x in range(0, width, image.width):
+        for y in range(0, height, image.height):
+            new.paste(image, (x, y))
+    return new
+
+
+def nine_slice_image(image: PIL.Image.Image, borders: tuple[int, int, int, int], width: int, height: int) -> PIL.Image.Image:
+    """Scale image to width x height, keeping the borders (top, right, bottom, left) unscaled"""
+    top, right, bottom, left = borders
+    xs = [(0, 0), (left, left), (image.width - right, width - right), (image.width, width)]
+    ys = [(0, 0), (top, top), (image.height - bottom, height - bottom), (image.height, height)]
+
+    new = PIL.Image.new("RGBA", (width, height), (0, 0, 0, 0))
+    for (sx0, dx0), (sx1, dx1) in zip(xs, xs[1:]):
+        for (sy0, dy0), (sy1, dy1) in zip(ys, ys[1:]):
+            if sx1 > sx0 and sy1 > sy0 and dx1 > dx0 and dy1 > dy0:
+                part = image.crop((sx0, sy0, sx1, sy1)).resize((dx1 - dx0, dy1 - dy0), PIL.Image.Resampling.NEAREST)
+                new.paste(part, (dx0, dy0))
+    return new
+
+
+class EntitySpriteFactory:
+    """Build sprites for entities, from their definition tile.
+
+    The tile is drawn as asked by the definition tile_render_mode, and anchored
+    at the entity pivot, so a tile bigger than the entity box overflows it on
+    the side opposite to the pivot. Textures generated for a mode (repeat, nine slice, crop...) are
+    cached by tile and size, so entities of the same kind share them.
+
+    The sprite class can be chosen by entity identifier, it is called with the
+    texture as only argument."""
+
+    def __init__(self, sprite_classes: Optional[dict[str, type[arcade.Sprite]]] = None):
+        self.sprite_classes: dict[str, type[arcade.Sprite]] = dict(sprite_classes or {})
+        self._textures: dict[TextureKey, arcade.Texture] = {}
+
+    def register(self, identifier: str, sprite_class: type[arcade.Sprite]):
+        """Use sprite_class for entities with this identifier"""
+        self.sprite_classes[identifier] = sprite_class
+
+    def _cached(self, mode: str, name: str, width: int, height: int, make: Callable[[], PIL.Image.Image]) -> arcade.Texture:
+        key = (mode, name, width, height)
+        texture = self._textures.get(key)
+        if texture is None:
+            texture = self._textures[key] = arcade.Texture(make())
+        return texture
+
+    def texture(self, entity: EntityInstance) -> tuple[arcade.Texture, float, float]:
+        """Return the texture for entity, and the size to draw it"""
+        def_ = entity.def_
+        width, height = entity.width, entity.height
+        tile = def_.tile
+        if tile is None:
+            color = arcade.types.Color.from_hex_string(def_.color) if isinstance(def_.color, str) else def_.color
+            texture = self._cached("Color", str(tuple(color)), width, height,
+                                   lambda: PIL.Image.new("RGBA", (width, height), tuple(color)))
+            return texture, width, height
+
+        name = tile.image_data.hash
+        match def_.tile_render_mode:
+            case "Stretch":
+                return tile, width, height
+            case "FitInside":
+                scale = min(width / tile.width, height / tile.height)
+                return tile, tile.width * scale, tile.height * scale
+            case "Cover":
+                scale = max(width / tile.width, height / tile.height)
+                crop_w, crop_h = round(width / scale), round(height / scale)
+                x, y = round((tile.width - crop_w) * def_.pivot_x), round((tile.height - crop_h) * def_.pivot_y)
+                texture = self._cached("Cover", f"{name}@{x},{y}", crop_w, crop_h,
+                                       lambda: tile.image.crop((x, y, x + crop_w, y + crop_h)))
+                return texture, width, height
+            case "Repeat":
+                return self._cached("Repeat", name, width, height,
+                                    lambda: repeat_image(tile.image, width, height)), width, height
+            case "NineSlice" if def_.nine_slice_borders:
+                borders = def_.nine_slice_borders
+                return self._cached("NineSlice", name, width, height,
+                                    lambda: nine_slice_image(tile.image, borders, width, height)), width, height
+            case "NineSlice":
+                return tile, width, height
+            case "FullSizeCropped":
+                crop_w, crop_h = min(width, tile.width), min(height, tile.height)
+                x, y = round((tile.width - crop_w) * def_.pivot_x), round((tile.height - crop_h) * def_.pivot_y)
+                texture = self._cached("FullSizeCropped", f"{name}@{x},{y}", crop_w, crop_h,
+                                       lambda: tile.image.crop((x, y, x + crop_w, y + crop_h)))
+                return texture, crop_w, crop_h
+            case _:
+                # FullSizeUncropped
+                return tile, tile.width, tile.height
+
+    def make_sprite(self, entity: EntityInstance) -> arcade.Sprite:
+        """Return a sprite for entity, its pivot being at the entity position"""
+        texture, width, height = self.texture(entity)
+        sprite = self.sprite_classes.get(entity.identifier, arcade.Sprite)(texture)
+        sprite.size = (width, height)
+
+        layer = entity.parent
+        x, y = entity.px
+        sprite.position = (
+            x + (0.5 - entity.def_.pivot_x) * width + layer.px_total_offset_x,
+            y + (entity.def_.pivot_y - 0.5) * height + layer.px_total_offset_y
+        )
+        sprite.properties["iid"] = entity.iid
+        return sprite
+
+    def sprite_list(self, entities: LayerInstance | Iterable[EntityInstance],
+                    identifiers: Optional[Iterable[str]] = None,
+                    tags: Optional[Iterable[str]] = None, **kwargs) -> arcade.SpriteList:
+        """Return a SpriteList with a sprite for each entity.
+        If identifiers or tags are given, only entities having one of them are kept"""
+        if isinstance(entities, LayerInstance):
+            if identifiers is not None:
+                entities = [e for i in identifiers for e in entities.entity_by_identifier.get(i, [])]
+                identifiers = None
+            else:
+                entities = entities.entity_list
+
+        selected = list(entities)
+        if identifiers is not None:
+            wanted = set(identifiers)
+            selected = [e for e in selected if e.identifier in wanted]
+        if tags is not None:
+            wanted = set(tags)
+            selected = [e for e in selected if not wanted.isdisjoint(e.tags)]
+
+        kwargs.setdefault("capacity", max(len(selected), 1))
+        sprite_list = arcade.SpriteList(**kwargs)
+        sprite_list.extend(self.make_sprite(e) for e in selected)
+        return sprite_list
@@ -0,0 +1,144 @@
+from collections import deque
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterable, Optional
+
+if TYPE_CHECKING:
+    from .levels import Level
+
+
+OPPOSITE = {
+    "n": "s", "s": "n", "e": "w", "w": "e",
+    "ne": "sw", "sw": "ne", "nw": "se", "se": "nw",
+    "<": ">", ">": "<", "o": "o"
+}
+
+
+@dataclass(slots=True, frozen=True, eq=False)
+class LevelEdge:
+    """Compared and hashed by identity: levels can't be hashed and comparing them is deep"""
+    level: "Level"
+    "The neighbour level"
+    dir: str
+    """Where the neighbour is, as in ldtk: n, s, w, e, the diagonals ne, nw, se, sw,
+< (lower depth), > (greater depth) or o (overlap)"""
+    span: Optional[tuple[int, int]]
+    """For n, s, e and w, the shared border, in world coordinates along it:
+x for n and s, y for e and w"""
+
+
+def _span(a: "Level", b: "Level", dir: str) -> Optional[tuple[int, int]]:
+    if dir in ("n", "s"):
+        start, end = max(a.world_x, b.world_x), min(a.world_x + a.width, b.world_x + b.width)
+    elif dir in ("e", "w"):
+        start, end = max(a.world_y, b.world_y), min(a.world_y + a.height, b.world_y + b.height)
+    else:
+        return None
+    return (start, end) if start < end else None
+
+
+def _direction(a: "Level", b: "Level") -> Optional[str]:
+    """Where b is from a, computed from their world rectangles"""
+    ax0, ay0, ax1, ay1 = a.world_x, a.world_y, a.world_x + a.width, a.world_y + a.height
+    bx0, by0, bx1, by1 = b.world_x, b.world_y, b.world_x + b.width, b.world_y + b.height
+    if bx0 > ax1 or bx1 < ax0 or by0 > ay1 or by1 < ay0:
+        return None
+
+    if bx0 < ax1 and bx1 > ax0 and by0 < ay1 and by1 > ay0:
+        if a.world_depth == b.world_depth:
+            return "o"
+        return "<" if b.world_depth < a.world_depth else ">"
+    if a.world_depth != b.world_depth:
+        return None
+
+    vertical = "n" if by1 == ay0 else "s" if by0 == ay1 else ""
+    horizontal = "w" if bx1 == ax0 else "e" if bx0 == ax1 else ""
+    return vertical + horizontal
+
+
+class LevelGraph:
+    """Which levels are next to each other.
+
+    It uses the neighbours saved by ldtk when there are, else they are computed
+    from the world rectangles of the levels (or their order for linear layouts).
+    Routes are computed by breadth first search, and cached by starting level."""
+
+    def __init__(self, levels: Iterable["Level"], layout: Optional[str] = None):
+        self.levels = list(levels)
+        self.by_iid = { l.iid: l for l in self.levels }
+        self.edges: dict[str, list[LevelEdge]] = { l.iid: [] for l in self.levels }
+        self._routes: dict[str, dict[str, Optional[str]]] = {}
+
+        if any(l.neighbours for l in self.levels):
+            for level in self.levels:
+                for iid, dir in level.neighbours:
+                    if iid in self.by_iid:
+                        other = self.by_iid[iid]
+                        self.edges[level.iid].append(LevelEdge(other, dir, _span(level, other, dir)))
+        elif layout in ("LinearHorizontal", "LinearVertical"):
+            after, before = ("e", "w") if layout == "LinearHorizontal" else ("s", "n")
+            for a, b in zip(self.levels, self.levels[1:]):
+                self.edges[a.iid].append(LevelEdge(b, after, None))
+                self.edges[b.iid].append(LevelEdge(a, before, None))
+        else:
+            self._compute_edges()
+
+    def _compute_edges(self):
+        by_left = sorted(self.levels, key=lambda l: l.world_x)
+        for i, a in enumerate(by_left):
+            for b in by_left[i + 1:]:
+                if b.world_x > a.world_x + a.width:
+                    break
+                dir = _direction(a, b)
+                if dir:
+                    self.edges[a.iid].append(LevelEdge(b, dir, _span(a, b, dir)))
+                    self.edges[b.iid].append(LevelEdge(a, OPPOSITE[dir], _span(a, b, dir)))
+
+    def neighbours(self, level: "Level", dirs: Optional[Iterable[str]] = None) -> list[LevelEdge]:
+        """Return the edges from level, only those going in dirs if given"""
+        edges = self.edges[level.iid]
+        if dirs is None:
+            return edges
+        wanted = set(dirs)
+        return [e for e in edges if e.dir in wanted]
+
+    def _tree(self, start: "Level") -> dict[str, Optional[str]]:
+        tree = self._routes.get(start.iid)
+        if tree is None:
+            tree = { start.iid: None }
+            queue = deque([start.iid])
+            while queue:
+                iid = queue.popleft()
+                for edge in self.edges[iid]:
+                    if edge.level.iid not in tree:
+                        tree[edge.level.iid] = iid
+                        queue.append(edge.level.iid)
+            self._routes[start.iid] = tree
+        return tree
+
+    def route(self, start: "Level", end: "Level") -> Optional[list["Level"]]:
+        """Return the shortest list of levels going from start to end, both included,
+        or None if end can't be reached"""
+        tree = self._tree(start)
+        if end.iid not in tree:
+            return None
+        path = []
+        iid: Optional[str] = end.iid
+        while iid is not None:
+            path.append(self.by_iid[iid])
+            iid = tree[iid]
+        path.reverse()
+        return path
+
+    def within(self, level: "Level", hops: int) -> list[tuple["Level", int]]:
+        """Return the levels at most hops steps from level, with their distance, nearest first"""
+        found = { level.iid: 0 }
+        queue = deque([level.iid])
+        while queue:
+            iid = queue.popleft()
+            if found[iid] == hops:
+                continue
+            for edge in self.edges[iid]:
+                if edge.level.iid not in found:
+                    found[edge.level.iid] = found[iid] + 1
+                    queue.append(edge.level.iid)
+        return [(self.by_iid[iid], distance) for iid, distance in found.items()]
@@ -1,5 +1,5 @@
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Any, Literal, Optional, Self
 import json
 import os.path
@@ -8,6 +8,10 @@ import arcade
 
 from .levels import LayerInstance, Level, EntityRef, EntityInstance
 from .defs import Defs
+from .changes import ChangeLog
+from .graph import LevelGraph
+from .world import WorldScene
+from .lod import LevelThumbnails
 
 
 @dataclass(slots=True, kw_only=True)
@@ -24,6 +28,12 @@ class LDtk:
     world_layout: Optional[Literal["Free"] | Literal["GridVania"] | Literal["LinearHorizontal"] | Literal["LinearVertical"]]
     world: None
     default_grid_size: int
+    layers_by_iid: dict[str, LayerInstance] = field(default_factory=dict)
+    entity_by_iid: dict[str, EntityInstance] = field(default_factory=dict)
+    changes: ChangeLog = field(default_factory=ChangeLog)
+    """Changes made since loading, see save_changes"""
+    graph: LevelGraph = field(default_factory=lambda: LevelGraph([]))
+    """Which levels are next to each other"""
 
     @classmethod
     def from_json(cls, path:str, dict:dict[str, Any]) -> Self:
@@ -52,6 +62,9 @@ class LDtk:
         )
         new.levels = [Level.from_json(new, path, l) for l in dict["levels"]]
         new.levels_by_iid = { l.iid: l for l in new.levels }
+        new.layers_by_iid = { l.iid: l for level in new.levels for l in level.layers }
+        new.graph = LevelGraph(new.levels, new.world_layout)
+        new.entity_by_iid = { e.iid: e for l in new.layers_by_iid.values() for e in l.entity_list }
         return new
 
     def get_entity(self, it:EntityRef) -> tuple[Level, LayerInstance, EntityInstance]:
@@ -60,6 +73,20 @@ class LDtk:
         entity = layer.entity_by_iid[it["entityIid"]]
         return level, layer, entity
 
+    def save_changes(self, path:str):
+        """Save the changes made since loading, as a compact binary delta"""
+        with open(path, "wb") as f:
+            f.write(self.changes.to_bytes())
+
+    def load_changes(self, path:str):
+        """Redo on this freshly loaded project the changes saved at path"""
+        with open(path, "rb") as f:
+            ChangeLog.from_bytes(f.read()).apply(self)
+
+    def make_world_scene(self, levels:Optional[list[Level]] = None, thumbnails:Optional[LevelThumbnails] = None) -> WorldScene:
+        """Return a scene drawing all the given levels (default to all levels) at their world position"""
+        return WorldScene(self.levels if levels is None else levels, thumbnails)
+
     def get_levels_at_point(self, x:float, y:float) -> list[Level]:
         """Return the levels at point, using word coordinate"""
         return [level for level in self.levels if level.contains_world_coord(x, y)]
@@ -1,13 +1,17 @@
-from dataclasses import dataclass
-from typing import TYPE_CHECKING, Any, Callable, Literal, Optional, Self, TypedDict
+from dataclasses import dataclass, field, replace
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Callable, Iterator, Literal, Optional, Self, TypedDict
 import os.path
+import uuid
 
 import arcade
+import numpy as np
 
 if TYPE_CHECKING:
     from . import LDtk
 
 from .defs import Defs, EntityDefinition, TileSet
+from .masks import EMPTY, TileMasks
 
 
 class HasDef:
@@ -52,6 +56,15 @@ class FieldInstance[T](HasDef):
         return cls(parent, identifier, type, value)
 
 
+    @classmethod
+    def changed(cls, parent: T, old: Optional[Self], identifier: str, value: Any, type: Optional[str]) -> Self:
+        """Return a new instance of the field, with another value"""
+        if type is None:
+            if old is None:
+                raise KeyError(f"{identifier} is not a known field, its type must be given")
+            type = old.type
+        return cls(parent, identifier, type, value)
+
     def __str__(self) -> str:
         return f"FieldInstance:(id: {self.identifier}, type: {self.type}, value: {self.value!r})"
     
@@ -113,6 +126,11 @@ class EntityInstance(HasDef):
         new.fields = FieldInstance.build_instance_dict(new, parent.parent, dict["fieldInstances"])
         return new
 
+    def set_field(self, identifier: str, value: Any, type: Optional[str] = None):
+        """Change the value of a field. The type is only needed for a field the entity doesn't have yet"""
+        self.fields[identifier] = FieldInstance.changed(self, self.fields.get(identifier), identifier, value, type)
+        self.parent.parent.parent.changes.fields[(self.iid, identifier)] = (self.fields[identifier].type, value)
+
 
 @dataclass(slots=True, frozen=True)
 class TileInstance(HasDef):
@@ -122,6 +140,10 @@ class TileInstance(HasDef):
     flip_y: bool
     position: tuple[float, float]
     texture: arcade.Texture
+    tile_id: int
+    "The tile id in the tileset"
+    cell: tuple[int, int]
+    "Grid-based coordinates of the tile, in the layer grid"
 
     @classmethod
     def from_json(cls, parent:"LayerInstance", dict:dict[str, Any], tileSet:TileSet) -> Self:
@@ -131,7 +153,24 @@ class TileInstance(HasDef):
         x, y = parent.parent.convert_coord(dict["px"][0], dict["px"][1])
         position = (x, y)
         texture = tileSet[dict["t"]]
-        return cls(parent, alpha, flip_x, flip_y, position, texture)
+        cell = (dict["px"][0] // parent.grid_size, dict["px"][1] // parent.grid_size)
+        return cls(parent, alpha, flip_x, flip_y, position, texture, dict["t"], cell)
+
+    @classmethod
+    def from_cell(cls, parent:"LayerInstance", cx:int, cy:int, tile_id:int,
+                  flip_x:bool = False, flip_y:bool = False, alpha:float = 1.0) -> Self:
+        """Build a new tile at the given cell of the parent layer"""
+        if parent.tileset is None:
+            raise ValueError("this layer has no tileset")
+        position = parent.parent.convert_coord(cx * parent.grid_size, cy * parent.grid_size)
+        return cls(parent, alpha, flip_x, flip_y, position, parent.tileset[tile_id], tile_id, (cx, cy))
+
+    @property
+    def sprite_texture(self) -> arcade.Texture:
+        """The texture to draw, with flips applied"""
+        if self.parent.tileset is None:
+            return self.texture
+        return self.parent.tileset.get_tile(self.tile_id, self.flip_x, self.flip_y)
 
 
 @dataclass(slots=True, kw_only=True)
@@ -192,6 +231,19 @@ px_total_offset_y which contains the total offset value)"""
     """Layer instance visibility"""
 
     _sprite_list: Optional[arcade.SpriteList] = None
+    _tiles_by_cell: Optional[dict[tuple[int, int], list[TileInstance]]] = None
+    """Index from cell to the stack of tiles in it, built on first edit"""
+    _tiles_in_order: Optional[dict[int, TileInstance]] = None
+    """The tiles in display order, by id, built with _tiles_by_cell"""
+    _sprites_by_cell: dict[tuple[int, int], list[arcade.Sprite]] = field(default_factory=dict)
+    """Index from cell to the sprites drawing it, valid while _sprite_list is"""
+    _free_sprites: list[arcade.Sprite] = field(default_factory=list)
+    """Hidden sprites of cleared cells, ready to be reused"""
+    _pending_sprites: Optional[list[arcade.Sprite]] = None
+    """Sprites to add to the sprite list at the end of a batch_edit"""
+    _masks: Optional[TileMasks] = None
+    _int_grid: Optional[np.ndarray] = None
+
         
     @classmethod
     def from_json(cls, parent: "Level", dict:dict[str, Any]) -> Self:
@@ -240,34 +292,239 @@ px_total_offset_y which contains the total offset value)"""
     def has_tiles(self) -> bool:
         return self.auto_layer_tiles is not None or self.grid_tiles is not None
 
-    def sprite_list(self, regenerate: bool = False, **kwargs) -> arcade.SpriteList:
-        if not regenerate and self._sprite_list:
-            return self._sprite_list
+    def tiles(self) -> list[TileInstance]:
+        """Return the current tiles of the layer, in display order"""
+        if self._tiles_in_order is not None:
+            return list(self._tiles_in_order.values())
+        elif self.type == "Tiles" and self.grid_tiles is not None:
+            return self.grid_tiles
         elif self.auto_layer_tiles is not None:
-            tiles = self.auto_layer_tiles
-        elif self.grid_tiles is not None:
-            tiles = self.grid_tiles
+            return self.auto_layer_tiles
         else:
             raise ValueError("this layer has no sprite")
 
+    def reload_textures(self):
+        """Take again the tile textures from the tileset, after they were changed.
+        The sprite list will be regenerated on next use"""
+        if self.tileset is None:
+            return
+        tileset = self.tileset
+
+        def reload(tiles: list[TileInstance]) -> list[TileInstance]:
+            return [replace(t, texture=tileset[t.tile_id]) for t in tiles]
+
+        if self.auto_layer_tiles is not None:
+            self.auto_layer_tiles = reload(self.auto_layer_tiles)
+        if self.grid_tiles is not None:
+            self.grid_tiles = reload(self.grid_tiles)
+        if self._tiles_in_order is not None:
+            tiles = self.tiles()
+            self._tiles_by_cell = self._tiles_in_order = None
+            self._build_index(reload(tiles))
+        self._sprite_list = None
+
+    def sprite_list(self, regenerate: bool = False, **kwargs) -> arcade.SpriteList:
+        if not regenerate and self._sprite_list:
+            return self._sprite_list
+
+        tiles = self.tiles()
+
         self._sprite_list = arcade.SpriteList(**kwargs)
-    
+        self._sprites_by_cell = {}
+        self._free_sprites = []
+
         for t in tiles:
-            texture = t.texture
-            if t.flip_x:
-                texture = texture.flip_horizontally()
-            if t.flip_y:
-                texture = texture.flip_vertically()
-
-            sprite = arcade.Sprite(
-                texture,
-                center_x=t.position[0] + self.grid_size/2 + self.px_total_offset_x,
-                center_y=t.position[1] - self.grid_size/2 + self.px_total_offset_y
-            )
+            sprite = self._make_sprite(t)
+            self._sprites_by_cell.setdefault(t.cell, []).append(sprite)
             self._sprite_list.append(sprite)
 
         return self._sprite_list
 
+    def _make_sprite(self, t: TileInstance, offset_x: float = 0, offset_y: float = 0) -> arcade.Sprite:
+        sprite = arcade.Sprite(t.sprite_texture)
+        self._place_sprite(sprite, t, offset_x, offset_y)
+        return sprite
+
+    def _place_sprite(self, sprite: arcade.Sprite, t: TileInstance, offset_x: float = 0, offset_y: float = 0):
+        sprite.texture = t.sprite_texture
+        sprite.position = (
+            t.position[0] + self.grid_size/2 + self.px_total_offset_x + offset_x,
+            t.position[1] - self.grid_size/2 + self.px_total_offset_y + offset_y
+        )
+        sprite.alpha = round(t.alpha * 255)
+        sprite.visible = True
+
+    def _build_index(self, tiles: list[TileInstance]):
+        index: dict[tuple[int, int], list[TileInstance]] = {}
+        for t in tiles:
+            index.setdefault(t.cell, []).append(t)
+        self._tiles_in_order = { id(t): t for t in tiles }
+        self._tiles_by_cell = index
+
+    def _cell_index(self) -> dict[tuple[int, int], list[TileInstance]]:
+        if self._tiles_by_cell is None:
+            self._build_index(self.tiles())
+        assert self._tiles_by_cell is not None
+        return self._tiles_by_cell
+
+    def _remove_stack(self, cell: tuple[int, int]) -> list[TileInstance]:
+        stack = self._cell_index().pop(cell, [])
+        assert self._tiles_in_order is not None
+        for t in stack:
+            del self._tiles_in_order[id(t)]
+        return stack
+
+    def _check_cell(self, cx: int, cy: int):
+        if not (0 <= cx < self.c_width and 0 <= cy < self.c_height):
+            raise IndexError(f"cell ({cx}, {cy}) is outside the {self.c_width}x{self.c_height} layer")
+
+    def set_int_grid(self, cx: int, cy: int, value: int):
+        """Set the IntGrid value of cell (cx, cy), 0 meaning empty"""
+        if not self.int_grid_csv:
+            raise ValueError("this layer is not an IntGrid")
+        self._check_cell(cx, cy)
+        self.int_grid_csv[cy * self.c_width + cx] = value
+        if self._int_grid is not None:
+            self._int_grid[cy, cx] = value
+        self.parent.parent.changes.int_grid[(self.iid, cx, cy)] = value
+
+    def int_grid_array(self) -> np.ndarray:
+        """Return the IntGrid values as an array indexed by [cy, cx], kept up to date by set_int_grid"""
+        if not self.int_grid_csv:
+            raise ValueError("this layer is not an IntGrid")
+        if self._int_grid is None:
+            self._int_grid = np.array(self.int_grid_csv, dtype=np.int32).reshape(self.c_height, self.c_width)
+        return self._int_grid
+
+    def add_entity(self, identifier: str, x: float, y: float,
+                   width: Optional[int] = None, height: Optional[int] = None,
+                   iid: Optional[str] = None) -> EntityInstance:
+        """Add a new entity at (x, y) in level arcade coordinates.
+        It has no field, they can be added with set_field"""
+        def_ = self.defs.entities[identifier]
+        new = EntityInstance(
+            self, def_.identifier, (0, 0), def_.uid, def_, list(def_.tags), {}, iid or str(uuid.uuid4()),
+            None, None, (x, y), height or def_.height, width or def_.width
+        )
+        self.entity_list.append(new)
+        self.entity_by_iid[new.iid] = new
+        self.entity_by_identifier.setdefault(new.identifier, []).append(new)
+        ldtk = self.parent.parent
+        ldtk.entity_by_iid[new.iid] = new
+        ldtk.changes.added[new.iid] = (self.iid, new.identifier, new.width, new.height)
+        self.move_entity(new, x, y)
+        return new
+
+    def move_entity(self, entity: EntityInstance, x: float, y: float):
+        """Move entity to (x, y) in level arcade coordinates"""
+        level = self.parent
+        px, py = level.convert_coord(x, y)
+        entity.px = (x, y)
+        entity.grid = (int(px // self.grid_size), int(py // self.grid_size))
+        if level.parent.world_layout in ("Free", "GridVania"):
+            entity.world_x = int(level.world_x + px)
+            entity.world_y = int(level.world_y + py)
+        level.parent.changes.moved[entity.iid] = (x, y)
+
+    def remove_entity(self, entity: EntityInstance):
+        """Remove entity from the layer and from the project indexes"""
+        # by identity: comparing entities goes through their fields back to them
+        def remove(entities: list[EntityInstance]):
+            del entities[next(i for i, e in enumerate(entities) if e is entity)]
+        remove(self.entity_list)
+        del self.entity_by_iid[entity.iid]
+        remove(self.entity_by_identifier[entity.identifier])
+        ldtk = self.parent.parent
+        del ldtk.entity_by_iid[entity.iid]
+        ldtk.changes.remove_entity(entity.iid)
+
+    def tile_masks(self) -> TileMasks:
+        """Return the tile ids and tag masks of this layer, indexed by cell"""
+        if self._masks is None:
+            self._masks = TileMasks(self)
+        return self._masks
+
+    def cell_at(self, x: float, y: float) -> tuple[int, int]:
+        """Return the cell containing the point (x, y), in level arcade coordinates"""
+        x, y = self.parent.convert_coord(x - self.px_total_offset_x, y - self.px_total_offset_y)
+        return (int(x // self.grid_size), int(y // self.grid_size))
+
+    def get_tile(self, cx: int, cy: int) -> Optional[TileInstance]:
+        """Return the top tile at cell (cx, cy), or None if the cell is empty"""
+        stack = self._cell_index().get((cx, cy))
+        return stack[-1] if stack else None
+
+    def set_tile(self, cx: int, cy: int, tile_id: int,
+                 flip_x: bool = False, flip_y: bool = False, alpha: float = 1.0) -> TileInstance:
+        """Set the tile at cell (cx, cy), replacing any tile already there.
+        The new tile comes last in display order, the other tiles keep theirs.
+        Only the sprite of this cell is updated."""
+        if not self.has_tiles():
+            raise ValueError("this layer has no sprite")
+        self._check_cell(cx, cy)
+        tile = TileInstance.from_cell(self, cx, cy, tile_id, flip_x, flip_y, alpha)
+        self._remove_stack((cx, cy))
+        self._cell_index()[(cx, cy)] = [tile]
+        assert self._tiles_in_order is not None
+        self._tiles_in_order[id(tile)] = tile
+        if self._masks is not None:
+            self._masks.update_cell(cx, cy, tile_id)
+        self.parent.parent.changes.tiles[(self.iid, cx, cy)] = (tile_id, flip_x, flip_y, alpha)
+
+        if self._sprite_list is not None:
+            sprites = self._sprites_by_cell.get((cx, cy))
+            if sprites:
+                for extra in sprites[1:]:
+                    self._hide_sprite(extra)
+                sprite = sprites[0]
+                self._place_sprite(sprite, tile)
+            elif self._free_sprites:
+                sprite = self._free_sprites.pop()
+                self._place_sprite(sprite, tile)
+            else:
+                sprite = self._make_sprite(tile)
+                if self._pending_sprites is not None:
+                    self._pending_sprites.append(sprite)
+                else:
+                    self._sprite_list.append(sprite)
+            self._sprites_by_cell[(cx, cy)] = [sprite]
+
+        return tile
+
+    def clear_tile(self, cx: int, cy: int) -> bool:
+        """Remove every tile at cell (cx, cy). Return False if the cell was already empty"""
+        if not self.has_tiles():
+            raise ValueError("this layer has no sprite")
+        self._check_cell(cx, cy)
+        stack = self._remove_stack((cx, cy))
+        if self._masks is not None:
+            self._masks.update_cell(cx, cy, EMPTY)
+        self.parent.parent.changes.tiles[(self.iid, cx, cy)] = None
+        for sprite in self._sprites_by_cell.pop((cx, cy), []):
+            self._hide_sprite(sprite)
+        return bool(stack)
+
+    def _hide_sprite(self, sprite: arcade.Sprite):
+        # removing from a SpriteList is O(n), hidden sprites are reused by set_tile
+        sprite.visible = False
+        self._free_sprites.append(sprite)
+
+    @contextmanager
+    def batch_edit(self) -> Iterator[Self]:
+        """Group many tile edits: the sprites needed for new cells are added to
+        the sprite list in one extend at the end, instead of one append per edit"""
+        if self._pending_sprites is not None:
+            yield self
+            return
+
+        self._pending_sprites = []
+        try:
+            yield self
+        finally:
+            pending, self._pending_sprites = self._pending_sprites, None
+            if self._sprite_list is not None:
+                self._sprite_list.extend(pending)
+
 
 @dataclass(slots=True, kw_only=True)
 class Level(HasDef):
@@ -295,6 +552,8 @@ class Level(HasDef):
     world_depth: int
     world_x: int
     world_y: int
+    neighbours: list[tuple[str, str]]
+    """(level iid, direction) of the neighbour levels, see LevelEdge.dir"""
 
     @classmethod
     def from_json(cls, parent: "LDtk", path:str, level:dict[str, Any]) -> Self:
@@ -320,7 +579,8 @@ class Level(HasDef):
             world_depth = level["worldDepth"],
             # TODO: convert here ?
             world_x = level["worldX"],
-            world_y = level["worldY"]
+            world_y = level["worldY"],
+            neighbours = [(n["levelIid"], n["dir"]) for n in level["__neighbours"]]
         ) 
      
 
@@ -338,6 +598,11 @@ class Level(HasDef):
 
 
 
+    def set_field(self, identifier: str, value: Any, type: Optional[str] = None):
+        """Change the value of a field. The type is only needed for a field the level doesn't have yet"""
+        self.field_instances[identifier] = FieldInstance.changed(self, self.field_instances.get(identifier), identifier, value, type)
+        self.parent.changes.fields[(self.iid, identifier)] = (self.field_instances[identifier].type, value)
+
     def make_scene(self, regenerate=False) -> arcade.Scene:
         scene = arcade.Scene()
         for l in self.layers:
@@ -356,6 +621,11 @@ class Level(HasDef):
         (0, 0) is at bottom left for aracade!"""
         return (x * grid_size + grid_size / 2, (self.height - y * grid_size) - grid_size / 2)
         
+    def world_offset(self) -> tuple[float, float]:
+        """Offset to add to arcade coord in this level to get arcade coord in the world
+        (the world y axis goes up, so level are at negative y)"""
+        return (self.world_x, -self.world_y - self.height)
+
     def to_world_coord(self, x:float, y:float) -> tuple[float, float]:
         """Convert coord from arcade convention to world coordinate"""
         x, y = self.convert_coord(x, y)
@@ -0,0 +1,140 @@
+from typing import Iterable, Literal, Optional
+import math
+import os.path
+
+import arcade
+import numpy as np
+import PIL.Image
+
+from .levels import LayerInstance, Level
+
+
+Source = Literal["tiles"] | Literal["int_grid"]
+
+
+def _tile_image(layer: LayerInstance, tile_id: int, flip_x: bool, flip_y: bool, alpha: float) -> PIL.Image.Image:
+    assert layer.tileset is not None
+    image = layer.tileset[tile_id].image.convert("RGBA")
+    if flip_x:
+        image = image.transpose(PIL.Image.Transpose.FLIP_LEFT_RIGHT)
+    if flip_y:
+        image = image.transpose(PIL.Image.Transpose.FLIP_TOP_BOTTOM)
+    if alpha < 1:
+        image.putalpha(image.getchannel("A").point(lambda a: round(a * alpha)))
+    return image
+
+
+def render_tiles(level: Level) -> PIL.Image.Image:
+    """Draw the visible tile layers of level on an image of the level size"""
+    image = PIL.Image.new("RGBA", (level.width, level.height), tuple(level.bg_color))
+    for layer in reversed(level.layers):
+        if not layer.visible or not layer.has_tiles() or layer.tileset is None:
+            continue
+        cache: dict[tuple[int, bool, bool, float], PIL.Image.Image] = {}
+        for t in layer.tiles():
+            key = (t.tile_id, t.flip_x, t.flip_y, t.alpha * layer.opacity)
+            tile = cache.get(key)
+            if tile is None:
+                tile = cache[key] = _tile_image(layer, *key)
+            x = round(t.position[0] + layer.px_total_offset_x)
+            y = round(level.height - t.position[1] - layer.px_total_offset_y)
+            image.paste(tile, (x, y), tile)
+    return image
+
+
+def render_int_grid(level: Level) -> PIL.Image.Image:
+    """Draw the visible IntGrid layers of level with their values colors on an image of the level size"""
+    image = PIL.Image.new("RGBA", (level.width, level.height), tuple(level.bg_color))
+    for layer in reversed(level.layers):
+        if not layer.visible or layer.type != "IntGrid" or not layer.int_grid_csv:
+            continue
+        colors = level.defs.layers[layer.layer_def_uid].int_grid_colors
+        lookup = np.zeros((max(colors, default=0) + 1, 4), dtype=np.uint8)
+        for value, color in colors.items():
+            lookup[value] = (color.r, color.g, color.b, round(255 * layer.opacity))
+        values = layer.int_grid_array()
+        cells = PIL.Image.fromarray(lookup[np.clip(values, 0, len(lookup) - 1)])
+        cells = cells.resize((layer.c_width * layer.grid_size, layer.c_height * layer.grid_size), PIL.Image.Resampling.NEAREST)
+        overlay = PIL.Image.new("RGBA", image.size, (0, 0, 0, 0))
+        overlay.paste(cells, (layer.px_total_offset_x, -layer.px_total_offset_y))
+        image.alpha_composite(overlay)
+    return image
+
+
+def mipmaps(image: PIL.Image.Image, count: int) -> list[PIL.Image.Image]:
+    """Return image, then image downscaled by 2, by 4... count images in total"""
+    images = [image]
+    for _ in range(count - 1):
+        last = images[-1]
+        if last.width == 1 and last.height == 1:
+            break
+        images.append(last.resize((max(last.width // 2, 1), max(last.height // 2, 1)), PIL.Image.Resampling.BOX))
+    return images
+
+
+class LevelThumbnails:
+    """Pre-rendered images of levels, at full size then downscaled by 2 at each mip level.
+
+    Images are rendered on first use, kept in memory and, if cache_dir is
+    given, saved there as png to be loaded back next time. Delete the
+    directory when the project changes."""
+
+    def __init__(self, count: int = 4, source: Source = "tiles", cache_dir: Optional[str] = None):
+        self.count = count
+        self.source = source
+        self.cache_dir = cache_dir
+        self._textures: dict[str, list[arcade.Texture]] = {}
+
+    def _path(self, level: Level, mip: int) -> str:
+        assert self.cache_dir is not None
+        return os.path.join(self.cache_dir, f"{level.iid}_{self.source}_{mip}.png")
+
+    def _load(self, level: Level) -> Optional[list[PIL.Image.Image]]:
+        if self.cache_dir is None:
+            return None
+        paths = [self._path(level, mip) for mip in range(self.count)]
+        if not all(os.path.exists(path) for path in paths):
+            return None
+        return [PIL.Image.open(path).convert("RGBA") for path in paths]
+
+    def _render(self, level: Level) -> list[PIL.Image.Image]:
+        image = render_tiles(level) if self.source == "tiles" else render_int_grid(level)
+        images = mipmaps(image, self.count)
+        images += [images[-1]] * (self.count - len(images))
+        if self.cache_dir is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            for mip, mip_image in enumerate(images):
+                mip_image.save(self._path(level, mip))
+        return images
+
+    def textures(self, level: Level) -> list[arcade.Texture]:
+        """Return the textures of level, one by mip level"""
+        textures = self._textures.get(level.iid)
+        if textures is None:
+            images = self._load(level) or self._render(level)
+            textures = self._textures[level.iid] = [arcade.Texture(image) for image in images]
+        return textures
+
+    def get(self, level: Level, mip: int = 0) -> arcade.Texture:
+        return self.textures(level)[min(mip, self.count - 1)]
+
+    def mip_for_zoom(self, zoom: float) -> int:
+        """The smallest mip level still having at least one texel per screen pixel"""
+        if zoom >= 1:
+            return 0
+        return min(int(math.log2(1 / zoom)), self.count - 1)
+
+    def prepare(self, levels: Iterable[Level]):
+        """Render now the thumbnails of levels"""
+        for level in levels:
+            self.textures(level)
+
+    def forget(self, level: Level):
+        """Drop the thumbnails of level, in memory and in cache_dir, e.g. after it was changed.
+        A WorldScene showing level keeps the old ones, use WorldScene.refresh_thumbnail instead"""
+        self._textures.pop(level.iid, None)
+        if self.cache_dir is not None:
+            for mip in range(self.count):
+                path = self._path(level, mip)
+                if os.path.exists(path):
+                    os.remove(path)
@@ -0,0 +1,97 @@
+from typing import TYPE_CHECKING, Optional
+
+import arcade
+import numpy as np
+
+if TYPE_CHECKING:
+    from .levels import LayerInstance
+
+
+EMPTY = -1
+"tile id of cells without tile"
+
+
+class TileMasks:
+    """Cell indexed tile ids and tag masks of a tile layer.
+
+    tile_ids[cy, cx] is the id of the top tile of the cell (cx, cy), or EMPTY,
+    and masks[tag][cy, cx] tell if this tile is tagged by tag, cells use the
+    layer grid, with cy going down as in ldtk.
+
+    It is kept up to date by LayerInstance.set_tile and LayerInstance.clear_tile.
+    Cells outside the layer are empty."""
+
+    def __init__(self, layer: "LayerInstance"):
+        if layer.tileset is None:
+            raise ValueError("this layer has no tileset")
+        self.layer = layer
+        self.tileset = layer.tileset
+        self.tile_ids = np.full((layer.c_height, layer.c_width), EMPTY, dtype=np.int32)
+        for (cx, cy), stack in layer._cell_index().items():
+            if stack and 0 <= cx < layer.c_width and 0 <= cy < layer.c_height:
+                self.tile_ids[cy, cx] = stack[-1].tile_id
+
+        # one more entry, so that EMPTY (-1) index a False
+        nb_tiles = len(self.tileset.set) + 1
+        self._lookup: dict[str, np.ndarray] = {}
+        for tag, ids in self.tileset.enum_tag.items():
+            lookup = np.zeros(nb_tiles, dtype=bool)
+            lookup[ids] = True
+            self._lookup[tag] = lookup
+        self.masks: dict[str, np.ndarray] = { tag: lookup[self.tile_ids] for tag, lookup in self._lookup.items() }
+
+    def _inside(self, cx: int, cy: int) -> bool:
+        return 0 <= cx < self.layer.c_width and 0 <= cy < self.layer.c_height
+
+    def update_cell(self, cx: int, cy: int, tile_id: int = EMPTY):
+        if not self._inside(cx, cy):
+            return
+        self.tile_ids[cy, cx] = tile_id
+        for tag, lookup in self._lookup.items():
+            self.masks[tag][cy, cx] = lookup[tile_id]
+
+    def tile_id(self, cx: int, cy: int) -> int:
+        if not self._inside(cx, cy):
+            return EMPTY
+        return int(self.tile_ids[cy, cx])
+
+    def has_tag(self, cx: int, cy: int, tag: str) -> bool:
+        mask = self.masks.get(tag)
+        return mask is not None and self._inside(cx, cy) and bool(mask[cy, cx])
+
+    def tags(self, cx: int, cy: int) -> list[str]:
+        return self.tileset.tile_tags.get(self.tile_id(cx, cy), [])
+
+    def custom_data(self, cx: int, cy: int) -> Optional[list[str]]:
+        return self.tileset.custom_data.get(self.tile_id(cx, cy))
+
+    def has_tag_at_point(self, x: float, y: float, tag: str) -> bool:
+        """Like has_tag, using level arcade coordinates"""
+        return self.has_tag(*self.layer.cell_at(x, y), tag)
+
+    def tags_at_point(self, x: float, y: float) -> list[str]:
+        """Like tags, using level arcade coordinates"""
+        return self.tags(*self.layer.cell_at(x, y))
+
+    def custom_data_at_point(self, x: float, y: float) -> Optional[list[str]]:
+        """Like custom_data, using level arcade coordinates"""
+        return self.custom_data(*self.layer.cell_at(x, y))
+
+    def cells_with_tag(self, tag: str, rect: Optional[arcade.Rect] = None) -> np.ndarray:
+        """Return the (cx, cy) of the cells tagged by tag, as a N x 2 array.
+        If rect (in level arcade coordinates) is given, only cells touching it are returned"""
+        mask = self.masks.get(tag)
+        if mask is None:
+            return np.empty((0, 2), dtype=np.int64)
+
+        cx0 = cy0 = 0
+        if rect is not None:
+            cx0, cy0 = self.layer.cell_at(rect.left, rect.top)
+            cx1, cy1 = self.layer.cell_at(rect.right, rect.bottom)
+            if cx1 < 0 or cy1 < 0:
+                return np.empty((0, 2), dtype=np.int64)
+            cx0, cy0 = max(cx0, 0), max(cy0, 0)
+            mask = mask[cy0:cy1 + 1, cx0:cx1 + 1]
+
+        cys, cxs = np.nonzero(mask)
+        return np.column_stack((cxs + cx0, cys + cy0))
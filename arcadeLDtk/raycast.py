@@ -0,0 +1,197 @@
+from dataclasses import dataclass
+from typing import Iterable, Optional
+import math
+
+import numpy as np
+
+from .levels import LayerInstance
+
+
+@dataclass(slots=True, frozen=True)
+class RayHit:
+    cell: tuple[int, int]
+    "Grid-based coordinates of the blocking cell"
+    point: tuple[float, float]
+    "Where the ray enter the cell, in level arcade coordinates"
+    distance: float
+    "Distance from the origin of the ray, in pixels"
+
+
+@dataclass(slots=True, frozen=True)
+class RayHits:
+    """Result of IntGridRaycaster.cast_many, one row by ray"""
+    hit: np.ndarray
+    "True for rays stopped by a blocking cell"
+    points: np.ndarray
+    "N x 2 end of each ray: the hit point, or where it leaves the layer or reach max_distance"
+    distances: np.ndarray
+    cells: np.ndarray
+    "N x 2 (cx, cy) of the blocking cell, meaningless where hit is False"
+
+
+class IntGridRaycaster:
+    """Cast rays over an IntGrid layer, in level arcade coordinates.
+
+    Cells are blocking when their value is in blocking (by default, every
+    value but 0). The layer values are read at each cast, so cells changed with
+    LayerInstance.set_int_grid are taken into account. Rays stop when leaving the layer."""
+
+    def __init__(self, layer: LayerInstance, blocking: Optional[Iterable[int]] = None):
+        self.layer = layer
+        self.values = layer.int_grid_array()
+        self.grid_size = layer.grid_size
+        top = layer.parent.height + layer.px_total_offset_y
+        self._origin = (layer.px_total_offset_x, top)
+        "arcade coordinates of the top left corner of the grid"
+
+        self._blocking: Optional[np.ndarray] = None
+        "blocking values lookup, None when every value but 0 is blocking"
+        if blocking is not None:
+            blocking = list(blocking)
+            colors = layer.parent.defs.layers[layer.layer_def_uid].int_grid_colors
+            self._blocking = np.zeros(max([*colors, *blocking], default=0) + 1, dtype=bool)
+            self._blocking[blocking] = True
+
+    def _to_grid(self, x: float, y: float) -> tuple[float, float]:
+        return ((x - self._origin[0]) / self.grid_size, (self._origin[1] - y) / self.grid_size)
+
+    def _from_grid(self, u: float, v: float) -> tuple[float, float]:
+        return (self._origin[0] + u * self.grid_size, self._origin[1] - v * self.grid_size)
+
+    def _solid(self, values: np.ndarray) -> np.ndarray:
+        if self._blocking is None:
+            return values != 0
+        return (values < len(self._blocking)) & self._blocking[np.clip(values, 0, len(self._blocking) - 1)]
+
+    def is_blocking(self, cx: int, cy: int) -> bool:
+        value = self.values[cy, cx]
+        if self._blocking is None:
+            return value != 0
+        return value < len(self._blocking) and bool(self._blocking[value])
+
+    def cast(self, x: float, y: float, dx: float, dy: float, max_distance: float = math.inf) -> Optional[RayHit]:
+        """Return the first blocking cell on the ray from (x, y) in direction (dx, dy), if any"""
+        length = math.hypot(dx, dy)
+        if length == 0:
+            raise ValueError("null direction")
+        du, dv = dx / length, -dy / length
+        u, v = self._to_grid(x, y)
+        cu, cv = math.floor(u), math.floor(v)
+        height, width = self.values.shape
+        gs = self.grid_size
+
+        step_u = 1 if du > 0 else -1
+        step_v = 1 if dv > 0 else -1
+        delta_u = gs / abs(du) if du else math.inf
+        delta_v = gs / abs(dv) if dv else math.inf
+        max_u = ((cu + 1 - u) if du > 0 else (u - cu)) * delta_u if du else math.inf
+        max_v = ((cv + 1 - v) if dv > 0 else (v - cv)) * delta_v if dv else math.inf
+
+        t = 0.0
+        while 0 <= cu < width and 0 <= cv < height and t <= max_distance:
+            if self.is_blocking(cu, cv):
+                return RayHit((cu, cv), self._from_grid(u + t * du / gs, v + t * dv / gs), t)
+            if max_u < max_v:
+                t, max_u, cu = max_u, max_u + delta_u, cu + step_u
+            else:
+                t, max_v, cv = max_v, max_v + delta_v, cv + step_v
+        return None
+
+    def line_of_sight(self, x0: float, y0: float, x1: float, y1: float) -> bool:
+        """Tell if no blocking cell is between (x0, y0) and (x1, y1)"""
+        distance = math.hypot(x1 - x0, y1 - y0)
+        if distance == 0:
+            return True
+        return self.cast(x0, y0, x1 - x0, y1 - y0, distance) is None
+
+    def cast_many(self, origins: np.ndarray, directions: np.ndarray, max_distance: float | np.ndarray = math.inf) -> RayHits:
+        """Cast many rays at once, origins and directions being N x 2 arrays.
+        All rays advance of one cell per step, so the cost is in numpy, not in python"""
+        origins = np.asarray(origins, dtype=np.float64).reshape(-1, 2)
+        directions = np.asarray(directions, dtype=np.float64).reshape(-1, 2)
+        max_distance = np.broadcast_to(np.asarray(max_distance, dtype=np.float64), (len(origins),))
+        height, width = self.values.shape
+        gs = self.grid_size
+
+        length = np.hypot(directions[:, 0], directions[:, 1])
+        if np.any(length == 0):
+            raise ValueError("null direction")
+        du, dv = directions[:, 0] / length, -directions[:, 1] / length
+        u = (origins[:, 0] - self._origin[0]) / gs
+        v = (self._origin[1] - origins[:, 1]) / gs
+        cu, cv = np.floor(u).astype(np.int64), np.floor(v).astype(np.int64)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step_u = np.where(du > 0, 1, -1)
+            step_v = np.where(dv > 0, 1, -1)
+            delta_u = np.where(du != 0, gs / np.abs(du), np.inf)
+            delta_v = np.where(dv != 0, gs / np.abs(dv), np.inf)
+            max_u = np.where(du != 0, np.where(du > 0, cu + 1 - u, u - cu) * delta_u, np.inf)
+            max_v = np.where(dv != 0, np.where(dv > 0, cv + 1 - v, v - cv) * delta_v, np.inf)
+
+        def blocking(mask: np.ndarray) -> np.ndarray:
+            return mask & self._solid(self.values[np.clip(cv, 0, height - 1), np.clip(cu, 0, width - 1)])
+
+        inside = (0 <= cu) & (cu < width) & (0 <= cv) & (cv < height)
+        hit = blocking(inside)
+        distances = np.where(inside, max_distance, 0.0)
+        distances[hit] = 0.0
+        active = inside & ~hit
+
+        for _ in range(width + height + 2):
+            if not active.any():
+                break
+            along_u = max_u < max_v
+            t = np.where(along_u, max_u, max_v)
+            done = active & (t > max_distance)
+            active &= ~done
+
+            move_u, move_v = active & along_u, active & ~along_u
+            cu = np.where(move_u, cu + step_u, cu)
+            max_u = np.where(move_u, max_u + delta_u, max_u)
+            cv = np.where(move_v, cv + step_v, cv)
+            max_v = np.where(move_v, max_v + delta_v, max_v)
+
+            inside = (0 <= cu) & (cu < width) & (0 <= cv) & (cv < height)
+            left = active & ~inside
+            distances[left] = np.minimum(t[left], max_distance[left])
+            active &= inside
+
+            new_hit = blocking(active)
+            distances[new_hit] = t[new_hit]
+            hit |= new_hit
+            active &= ~new_hit
+
+        distances = np.where(np.isinf(distances), 0.0, distances)
+        points = origins + np.column_stack((du, -dv)) * distances[:, None]
+        return RayHits(hit, points, distances, np.column_stack((cu, cv)))
+
+    def visibility_polygon(self, x: float, y: float, radius: float, rays: int = 64) -> list[tuple[float, float]]:
+        """Return the polygon seen from (x, y) up to radius, sorted by angle.
+
+        Rays are cast at regular angles, and on both sides of each corner of the
+        blocking cells near (x, y), so walls edges are kept."""
+        angles = [np.linspace(-math.pi, math.pi, rays, endpoint=False)]
+
+        gs = self.grid_size
+        height, width = self.values.shape
+        u, v = self._to_grid(x, y)
+        r = radius / gs
+        u0, u1 = max(math.floor(u - r), 0), min(math.ceil(u + r), width)
+        v0, v1 = max(math.floor(v - r), 0), min(math.ceil(v + r), height)
+        if u0 < u1 and v0 < v1:
+            cvs, cus = np.nonzero(self._solid(self.values[v0:v1, u0:u1]))
+            if len(cus):
+                corners = np.unique(np.concatenate([
+                    np.column_stack((cus + du, cvs + dv)) for du in (0, 1) for dv in (0, 1)
+                ]), axis=0) + (u0, v0)
+                px = self._origin[0] + corners[:, 0] * gs - x
+                py = self._origin[1] - corners[:, 1] * gs - y
+                corner_angles = np.arctan2(py, px)
+                angles += [corner_angles - 1e-4, corner_angles + 1e-4]
+
+        angles = np.sort(np.concatenate(angles))
+        directions = np.column_stack((np.cos(angles), np.sin(angles)))
+        origins = np.broadcast_to((x, y), directions.shape)
+        result = self.cast_many(origins, directions, radius)
+        return [(float(px), float(py)) for px, py in result.points]
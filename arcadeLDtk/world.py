@@ -0,0 +1,141 @@
+from typing import Iterable, Optional
+
+import arcade
+
+from .levels import Level
+from .lod import LevelThumbnails
+
+
+LayerKey = tuple[int, int]
+"(layer depth, tileset uid): layers sharing a key are drawn by the same SpriteList"
+
+
+class WorldScene:
+    """Draw many levels at their world position with few draw calls.
+
+    Tiles layers of every attached level are merged in one SpriteList by
+    (layer depth, tileset), so the number of draw calls depends on the layers
+    definitions, not on the number of levels. Invisible layers are skipped,
+    and layer opacity is applied to each sprite.
+
+    Coordinates are in arcade convention, see Level.world_offset.
+    The sprites are built from the level tiles when attached: tiles edited after
+    that are only shown once the level is attached again. Sprites of detached
+    levels are hidden and reused by the next attached levels.
+
+    If thumbnails are given, each level also has a sprite showing its thumbnail,
+    drawn instead of the tiles when zoom is below lod_zoom. After a level is
+    changed, refresh_thumbnail renders its thumbnail again."""
+
+    def __init__(self, levels: Iterable[Level] = (),
+                 thumbnails: Optional[LevelThumbnails] = None, lod_zoom: float = 0.5):
+        self._sprite_lists: dict[LayerKey, arcade.SpriteList] = {}
+        self._sprites_by_level: dict[str, dict[LayerKey, list[arcade.Sprite]]] = {}
+        self._free_sprites: dict[LayerKey, list[arcade.Sprite]] = {}
+        "Hidden sprites of detached levels, by sprite list, the last one being drawn first"
+        self._positions: dict[int, int] = {}
+        "id of each tile sprite to its index in its sprite list"
+        self.thumbnails = thumbnails
+        self.lod_zoom = lod_zoom
+        self._thumbnail_list = arcade.SpriteList()
+        self._thumbnail_by_level: dict[str, tuple[Level, arcade.Sprite]] = {}
+        self._free_thumbnails: list[arcade.Sprite] = []
+        self._mip = 0
+        for level in levels:
+            self.attach(level)
+
+    def __contains__(self, level: Level) -> bool:
+        return level.iid in self._sprites_by_level
+
+    def attach(self, level: Level):
+        """Add the level to the scene, replacing it if it is already there"""
+        if level in self:
+            self.detach(level)
+
+        offset_x, offset_y = level.world_offset()
+        sprites_by_key: dict[LayerKey, list[arcade.Sprite]] = {}
+        for depth, layer in enumerate(level.layers):
+            if not layer.visible or not layer.has_tiles() or layer.tileset is None:
+                continue
+            key = (depth, layer.tileset.uid)
+            sprite_list = self._sprite_lists.get(key)
+            if sprite_list is None:
+                sprite_list = self._sprite_lists[key] = arcade.SpriteList()
+
+            sprites = sprites_by_key.setdefault(key, [])
+            free = self._free_sprites.get(key, [])
+            new = []
+            for t in layer.tiles():
+                if free:
+                    # free sprites are handed out in drawing order, so tiles keep theirs
+                    sprite = free.pop()
+                    layer._place_sprite(sprite, t, offset_x, offset_y)
+                else:
+                    sprite = layer._make_sprite(t, offset_x, offset_y)
+                    new.append(sprite)
+                sprite.alpha = round(t.alpha * layer.opacity * 255)
+                sprites.append(sprite)
+            self._positions.update((id(sprite), i) for i, sprite in enumerate(new, len(sprite_list)))
+            sprite_list.extend(new)
+
+        self._sprites_by_level[level.iid] = sprites_by_key
+
+        if self.thumbnails is not None:
+            texture = self.thumbnails.get(level, self._mip)
+            if self._free_thumbnails:
+                sprite = self._free_thumbnails.pop()
+                sprite.texture = texture
+                sprite.visible = True
+            else:
+                sprite = arcade.Sprite(texture)
+                self._thumbnail_list.append(sprite)
+            sprite.size = (level.width, level.height)
+            sprite.position = (offset_x + level.width / 2, offset_y + level.height / 2)
+            self._thumbnail_by_level[level.iid] = (level, sprite)
+
+    def detach(self, level: Level):
+        """Remove the level from the scene"""
+        for key, sprites in self._sprites_by_level.pop(level.iid).items():
+            # removing from a SpriteList is O(n), hidden sprites are reused by attach
+            for sprite in sprites:
+                sprite.visible = False
+            free = self._free_sprites.setdefault(key, [])
+            free.extend(sprites)
+            free.sort(key=lambda sprite: self._positions[id(sprite)], reverse=True)
+        if level.iid in self._thumbnail_by_level:
+            sprite = self._thumbnail_by_level.pop(level.iid)[1]
+            sprite.visible = False
+            self._free_thumbnails.append(sprite)
+
+    def refresh_thumbnail(self, level: Level):
+        """Render again the thumbnail of level, e.g. after it was changed"""
+        assert self.thumbnails is not None
+        self.thumbnails.forget(level)
+        if level.iid in self._thumbnail_by_level:
+            sprite = self._thumbnail_by_level[level.iid][1]
+            sprite.texture = self.thumbnails.get(level, self._mip)
+            sprite.size = (level.width, level.height)
+
+    @property
+    def sprite_lists(self) -> list[arcade.SpriteList]:
+        """The sprite lists, in drawing order (the first one is beneath the others)"""
+        return [self._sprite_lists[key] for key in sorted(self._sprite_lists, reverse=True)]
+
+    def draw(self, zoom: float = 1.0, **kwargs):
+        if self.thumbnails is not None and zoom < self.lod_zoom:
+            self._use_mip(self.thumbnails.mip_for_zoom(zoom))
+            self._thumbnail_list.draw(**kwargs)
+            return
+
+        for sprite_list in self.sprite_lists:
+            if sprite_list:
+                sprite_list.draw(**kwargs)
+
+    def _use_mip(self, mip: int):
+        if mip == self._mip:
+            return
+        assert self.thumbnails is not None
+        self._mip = mip
+        for level, sprite in self._thumbnail_by_level.values():
+            sprite.texture = self.thumbnails.get(level, mip)
+            sprite.size = (level.width, level.height)
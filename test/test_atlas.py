@@ -0,0 +1,52 @@
+import arcade
+import pytest
+
+import arcadeLDtk
+from arcadeLDtk.atlas import pack_shelves, used_tiles
+
+
+def test_packed_atlas(tmp_path):
+    example = arcadeLDtk.read_LDtk("test/samples/Test_file_for_API_showing_all_features.ldtk")
+    atlas = arcadeLDtk.PackedAtlas.from_ldtk(example, max_size=64)
+    assert len(atlas.pages) > 1
+    assert all(page.width <= 64 and page.height <= 64 for page in atlas.pages)
+    assert len(atlas.regions) <= len(atlas.tiles) + len(atlas.rects)
+
+    path = str(tmp_path / "atlas")
+    atlas.save(path)
+    loaded = arcadeLDtk.PackedAtlas.load(path)
+    assert loaded.tiles == atlas.tiles
+    assert loaded.regions == atlas.regions
+
+    uid, id = next(iter(used_tiles(example)))
+    before = example.defs.tilesets[uid][id]
+    loaded.apply(example)
+    after = example.defs.tilesets[uid][id]
+    assert after is not before
+    assert after.image_data.hash == before.image_data.hash
+    assert list(after.image.getdata()) == list(before.image.getdata())
+
+    layer = example.levels[0].layers_by_identifier["Tiles"]
+    assert all(t.texture is layer.tileset[t.tile_id] for t in layer.tiles())
+
+
+def test_pack_shelves_padding():
+    regions, pages = pack_shelves({ "a": (10, 10), "b": (10, 10), "c": (4, 4) }, 30, padding=2)
+    assert regions == { "a": (0, 2, 2, 10, 10), "b": (0, 16, 2, 10, 10), "c": (0, 2, 16, 4, 4) }
+    assert pages == [(28, 22)]
+
+
+def test_make_texture_atlases():
+    try:
+        window = arcade.Window(64, 64, visible=False)
+    except Exception:
+        pytest.skip("no OpenGL context")
+    example = arcadeLDtk.read_LDtk("test/samples/Test_file_for_API_showing_all_features.ldtk")
+    atlas = arcadeLDtk.PackedAtlas.from_ldtk(example, max_size=64)
+    atlases = atlas.make_texture_atlases(window.ctx)
+    assert len(atlases) == len(atlas.pages)
+    for page, texture_atlas in zip(atlas.pages, atlases):
+        assert texture_atlas.size == page.size
+    page, *_ = atlas.regions[next(iter(atlas.regions))]
+    assert atlases[page].has_texture(atlas.texture(next(iter(atlas.regions))))
+    window.close()
@@ -0,0 +1,131 @@
+import os.path
+import subprocess
+import sys
+
+import pytest
+
+import arcadeLDtk
+
+PATH = "test/samples/Typical_TopDown_example.ldtk"
+
+
+def test_save_changes(tmp_path):
+    example = arcadeLDtk.read_LDtk(PATH)
+    level = example.levels[0]
+    entities = level.layers_by_identifier["Entities"]
+    tiles = next(l for l in level.layers if l.has_tiles())
+    int_grid = next(l for l in level.layers if l.int_grid_csv)
+
+    moved, removed = entities.entity_list[0], entities.entity_list[1]
+    entities.move_entity(moved, 10, 20)
+    entities.remove_entity(removed)
+    added = entities.add_entity(moved.identifier, 30, 40)
+    added.set_field("life", 3, "Int")
+    level.set_field("note", "visited", "String")
+    tiles.set_tile(0, 0, 5, flip_y=True)
+    tiles.clear_tile(1, 0)
+    int_grid.set_int_grid(2, 3, 1)
+
+    path = os.path.join(tmp_path, "delta")
+    example.save_changes(path)
+    assert os.path.getsize(path) < 1000
+
+    fresh = arcadeLDtk.read_LDtk(PATH)
+    fresh.load_changes(path)
+    assert fresh.changes == example.changes
+
+    level = fresh.levels[0]
+    entities = level.layers_by_iid[entities.iid]
+    assert entities.entity_by_iid[moved.iid].px == (10, 20)
+    assert removed.iid not in fresh.entity_by_iid
+    assert fresh.entity_by_iid[added.iid].px == (30, 40)
+    assert fresh.entity_by_iid[added.iid].fields["life"].value == 3
+    assert level.field_instances["note"].value == "visited"
+    tile = level.layers_by_iid[tiles.iid].get_tile(0, 0)
+    assert tile is not None and tile.tile_id == 5 and tile.flip_y
+    assert level.layers_by_iid[tiles.iid].get_tile(1, 0) is None
+    int_grid = level.layers_by_iid[int_grid.iid]
+    assert int_grid.int_grid_csv[3 * int_grid.c_width + 2] == 1
+
+
+def test_changes_are_coalesced():
+    example = arcadeLDtk.read_LDtk(PATH)
+    entities = example.levels[0].layers_by_identifier["Entities"]
+    entity = entities.entity_list[0]
+    for x in range(100):
+        entities.move_entity(entity, x, x)
+    assert len(example.changes) == 1
+
+    added = entities.add_entity(entity.identifier, 0, 0)
+    entities.remove_entity(added)
+    assert len(example.changes) == 1
+
+
+def test_round_trip():
+    example = arcadeLDtk.read_LDtk(PATH)
+    level = example.levels[0]
+    tiles = next(l for l in level.layers if l.has_tiles())
+    tiles.set_tile(0, 0, 5, alpha=0.3)
+    level.set_field("note", "x" * 70000, "String")
+    loaded = arcadeLDtk.ChangeLog.from_bytes(example.changes.to_bytes())
+    assert loaded == example.changes
+    assert loaded.tiles[(tiles.iid, 0, 0)] == (5, False, False, 0.3)
+
+
+def test_cells_out_of_layer():
+    example = arcadeLDtk.read_LDtk(PATH)
+    level = example.levels[0]
+    tiles = next(l for l in level.layers if l.has_tiles())
+    int_grid = next(l for l in level.layers if l.int_grid_csv)
+    for cx, cy in [(-1, 0), (int_grid.c_width, 0), (0, int_grid.c_height)]:
+        with pytest.raises(IndexError):
+            int_grid.set_int_grid(cx, cy, 1)
+    for cx, cy in [(-1, 0), (tiles.c_width, 0), (0, -1)]:
+        with pytest.raises(IndexError):
+            tiles.set_tile(cx, cy, 5)
+        with pytest.raises(IndexError):
+            tiles.clear_tile(cx, cy)
+    assert len(example.changes) == 0
+
+
+def test_added_entity_tags():
+    example = arcadeLDtk.read_LDtk(PATH)
+    entities = example.levels[0].layers_by_identifier["Entities"]
+    tagged = next(d for d in example.defs.entities.values() if d.tags)
+    added = entities.add_entity(tagged.identifier, 0, 0)
+    assert added.tags == tagged.tags
+    assert added.tags is not tagged.tags
+
+
+def test_remove_twin_entity():
+    example = arcadeLDtk.read_LDtk(PATH)
+    entities = example.levels[0].layers_by_identifier["Entities"]
+    identifier = entities.entity_list[0].identifier
+    first, second = entities.add_entity(identifier, 8, 8), entities.add_entity(identifier, 8, 8)
+    first.set_field("life", 3, "Int")
+    second.set_field("life", 3, "Int")
+    entities.remove_entity(second)
+    assert any(e is first for e in entities.entity_list)
+    assert not any(e is second for e in entities.entity_list)
+    assert not any(e is second for e in entities.entity_by_identifier[identifier])
+
+
+SAVE = """
+import sys, arcadeLDtk
+example = arcadeLDtk.read_LDtk(sys.argv[1])
+entities = example.levels[0].layers_by_identifier["Entities"]
+for entity in list(entities.entity_list):
+    entities.remove_entity(entity)
+example.save_changes(sys.argv[2])
+"""
+
+
+def test_same_bytes_for_same_changes(tmp_path):
+    outputs = []
+    for seed in ("1", "2"):
+        path = os.path.join(tmp_path, seed)
+        subprocess.run([sys.executable, "-c", SAVE, PATH, path], capture_output=True, check=True,
+                       env={ **os.environ, "PYTHONHASHSEED": seed })
+        with open(path, "rb") as f:
+            outputs.append(f.read())
+    assert outputs[0] == outputs[1]
@@ -0,0 +1,106 @@
+from dataclasses import replace
+
+import arcade
+import PIL.Image
+
+import arcadeLDtk
+
+
+class Door(arcade.Sprite):
+    pass
+
+
+def test_entity_sprites():
+    example = arcadeLDtk.read_LDtk("test/samples/Typical_TopDown_example.ldtk")
+    factory = arcadeLDtk.EntitySpriteFactory({ "Door": Door })
+    for level in example.levels:
+        layer = level.layers_by_identifier["Entities"]
+        sprites = factory.sprite_list(layer)
+        assert len(sprites) == len(layer.entity_list)
+        for sprite, entity in zip(sprites, layer.entity_list):
+            assert sprite.properties["iid"] == entity.iid
+            assert isinstance(sprite, Door) == (entity.identifier == "Door")
+            if entity.def_.tile_render_mode in ("Stretch", "NineSlice", "Repeat"):
+                assert sprite.size == (entity.width, entity.height)
+            if entity.def_.pivot_x == 0 and entity.def_.pivot_y == 0:
+                assert sprite.left == entity.px[0] + layer.px_total_offset_x
+                assert sprite.top == entity.px[1] + layer.px_total_offset_y
+
+        doors = factory.sprite_list(layer, identifiers=["Door"])
+        assert all(isinstance(s, Door) for s in doors)
+        assert len(doors) == len(layer.entity_by_identifier.get("Door", []))
+
+
+def test_nine_slice_shared():
+    factory = arcadeLDtk.EntitySpriteFactory()
+    entity = tiled_entity("NineSlice", 8, 6, (1, 1, 1, 1))
+    a, b = factory.texture(entity), factory.texture(entity)
+    assert a[0] is b[0]
+    assert a[0] is not entity.def_.tile
+
+
+def tiled_entity(mode, width, height, borders=None, pivot=(0.5, 0.5)):
+    """An entity drawn with a 4x4 tile whose pixel (x, y) has color (x, y, 0)"""
+    example = arcadeLDtk.read_LDtk("test/samples/Typical_TopDown_example.ldtk")
+    entity = example.levels[0].layers_by_identifier["Entities"].entity_list[0]
+    tile = PIL.Image.new("RGBA", (4, 4))
+    tile.putdata([(x, y, 0, 255) for y in range(4) for x in range(4)])
+    entity.def_ = replace(entity.def_, tile=arcade.Texture(tile), tile_render_mode=mode, nine_slice_borders=borders,
+                          pivot_x=pivot[0], pivot_y=pivot[1])
+    entity.width, entity.height = width, height
+    return entity
+
+
+def test_nine_slice_tile():
+    texture, w, h = arcadeLDtk.EntitySpriteFactory().texture(tiled_entity("NineSlice", 8, 6, (1, 1, 1, 1)))
+    assert (w, h) == (8, 6)
+    assert texture.image.size == (8, 6)
+    assert texture.image.getpixel((0, 0)) == (0, 0, 0, 255)
+    assert texture.image.getpixel((7, 0)) == (3, 0, 0, 255)
+    assert texture.image.getpixel((0, 5)) == (0, 3, 0, 255)
+    assert texture.image.getpixel((7, 5)) == (3, 3, 0, 255)
+    assert texture.image.getpixel((4, 3))[:2] in [(1, 1), (1, 2), (2, 1), (2, 2)]
+
+
+def test_repeat_tile():
+    texture, w, h = arcadeLDtk.EntitySpriteFactory().texture(tiled_entity("Repeat", 10, 6))
+    assert (w, h) == (10, 6)
+    assert texture.image.size == (10, 6)
+    assert all(texture.image.getpixel((x, y)) == (x % 4, y % 4, 0, 255) for x in range(10) for y in range(6))
+
+
+def test_cover_tile():
+    texture, w, h = arcadeLDtk.EntitySpriteFactory().texture(tiled_entity("Cover", 8, 4))
+    assert (w, h) == (8, 4)
+    # scaled by 2 to cover the width, so only the two middle rows are shown
+    assert texture.image.size == (4, 2)
+    assert [texture.image.getpixel((0, y))[1] for y in range(2)] == [1, 2]
+
+    # cropped on the side opposite to the pivot
+    texture, _, _ = arcadeLDtk.EntitySpriteFactory().texture(tiled_entity("Cover", 8, 4, pivot=(0.5, 1)))
+    assert [texture.image.getpixel((0, y))[1] for y in range(2)] == [2, 3]
+
+
+def test_full_size_cropped_tile():
+    factory = arcadeLDtk.EntitySpriteFactory()
+    texture, w, h = factory.texture(tiled_entity("FullSizeCropped", 2, 3, pivot=(0, 0)))
+    assert (w, h) == (2, 3)
+    assert texture.image.size == (2, 3)
+    assert texture.image.getpixel((1, 2)) == (1, 2, 0, 255)
+
+    texture, w, h = factory.texture(tiled_entity("FullSizeCropped", 8, 8))
+    assert (w, h) == (4, 4)
+    assert texture.image.size == (4, 4)
+
+    texture, w, h = factory.texture(tiled_entity("FullSizeCropped", 2, 3, pivot=(1, 1)))
+    assert texture.image.getpixel((0, 0)) == (2, 1, 0, 255)
+
+
+def test_sprite_anchored_at_pivot():
+    # a 2x2 entity standing on its bottom center, drawn with its whole 4x4 tile
+    entity = tiled_entity("FullSizeUncropped", 2, 2, pivot=(0.5, 1))
+    layer = entity.parent
+    sprite = arcadeLDtk.EntitySpriteFactory().make_sprite(entity)
+    assert sprite.size == (4, 4)
+    assert sprite.bottom == entity.px[1] + layer.px_total_offset_y
+    assert sprite.center_x == entity.px[0] + layer.px_total_offset_x
@@ -0,0 +1,37 @@
+import arcadeLDtk
+from arcadeLDtk.graph import LevelGraph
+
+
+def test_graph_from_neighbours():
+    world = arcadeLDtk.read_LDtk("test/samples/WorldMap_GridVania_layout.ldtk")
+    graph = world.graph
+    level = world.levels[0]
+    assert {(e.level.iid, e.dir) for e in graph.neighbours(level)} == set(level.neighbours)
+
+    for edge in graph.neighbours(level, "nsew"):
+        assert edge.span is not None and edge.span[0] < edge.span[1]
+
+    far = world.levels[-1]
+    route = graph.route(level, far)
+    assert route is not None
+    assert route[0] is level and route[-1] is far
+    for a, b in zip(route, route[1:]):
+        assert any(e.level is b for e in graph.neighbours(a))
+    assert all(a is b for a, b in zip(graph.route(level, far), route))
+
+    around = graph.within(level, 1)
+    assert around[0][0] is level and around[0][1] == 0
+    assert {l.iid for l, d in around[1:]} == {e.level.iid for e in graph.neighbours(level)}
+
+    edges = graph.neighbours(level)
+    assert len(set(edges)) == len(edges)
+
+
+def test_computed_graph():
+    world = arcadeLDtk.read_LDtk("test/samples/WorldMap_GridVania_layout.ldtk")
+    for level in world.levels:
+        level.neighbours = []
+    computed = LevelGraph(world.levels, world.world_layout)
+    for level in world.levels:
+        expected = {(e.level.iid, e.dir) for e in world.graph.neighbours(level, "nsew")}
+        assert {(e.level.iid, e.dir) for e in computed.neighbours(level, "nsew")} == expected
@@ -0,0 +1,60 @@
+import os
+
+import arcadeLDtk
+
+PATH = "test/samples/WorldMap_GridVania_layout.ldtk"
+
+
+def test_thumbnails(tmp_path):
+    world = arcadeLDtk.read_LDtk(PATH)
+    level = world.levels[0]
+    thumbnails = arcadeLDtk.LevelThumbnails(count=3, cache_dir=str(tmp_path))
+    textures = thumbnails.textures(level)
+    assert [t.size for t in textures] == [(level.width, level.height), (level.width // 2, level.height // 2), (level.width // 4, level.height // 4)]
+    assert len(os.listdir(tmp_path)) == 3
+
+    loaded = arcadeLDtk.LevelThumbnails(count=3, cache_dir=str(tmp_path))
+    assert list(loaded.get(level, 1).image.getdata()) == list(textures[1].image.getdata())
+
+    loaded.forget(level)
+    assert os.listdir(tmp_path) == []
+    layer = level.layers_by_identifier["Collisions"]
+    layer.set_int_grid(0, 0, 1)
+    int_grid = arcadeLDtk.LevelThumbnails(count=3, source="int_grid", cache_dir=str(tmp_path))
+    before = int_grid.get(level).image.getpixel((0, 0))
+    layer.set_int_grid(0, 0, 0)
+    int_grid.forget(level)
+    assert int_grid.get(level).image.getpixel((0, 0)) != before
+
+    assert thumbnails.mip_for_zoom(2) == 0
+    assert thumbnails.mip_for_zoom(0.5) == 1
+    assert thumbnails.mip_for_zoom(0.01) == 2
+
+
+def test_int_grid_thumbnails():
+    world = arcadeLDtk.read_LDtk(PATH)
+    level = world.levels[0]
+    image = arcadeLDtk.LevelThumbnails(source="int_grid").get(level).image
+    layer = level.layers_by_identifier["Collisions"]
+    color = world.defs.layers[layer.layer_def_uid].int_grid_colors[1]
+    index = layer.int_grid_csv.index(1)
+    cx, cy = index % layer.c_width, index // layer.c_width
+    assert image.getpixel((cx * layer.grid_size, cy * layer.grid_size))[:3] == tuple(color)[:3]
+
+
+def test_world_scene_thumbnails():
+    world = arcadeLDtk.read_LDtk(PATH)
+    scene = world.make_world_scene(thumbnails=arcadeLDtk.LevelThumbnails(count=2))
+    assert len(scene._thumbnail_list) == len(world.levels)
+    level = world.levels[0]
+    scene.detach(level)
+    assert sum(s.visible for s in scene._thumbnail_list) == len(world.levels) - 1
+    scene.attach(level)
+    assert len(scene._thumbnail_list) == len(world.levels)
+    assert all(s.visible for s in scene._thumbnail_list)
+
+    sprite = scene._thumbnail_by_level[level.iid][1]
+    before = sprite.texture
+    scene.refresh_thumbnail(level)
+    assert sprite.texture is not before
+    assert sprite.size == (level.width, level.height)
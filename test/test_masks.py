@@ -0,0 +1,43 @@
+import arcade
+import arcadeLDtk
+from arcadeLDtk.masks import EMPTY
+
+
+def test_tile_masks():
+    example = arcadeLDtk.read_LDtk("test.ldtk")
+    layer = example.levels[0].layers_by_identifier["Typeobject"]
+    masks = layer.tile_masks()
+    assert masks.tile_ids.shape == (layer.c_height, layer.c_width)
+
+    for t in layer.tiles():
+        cx, cy = t.cell
+        assert masks.has_tag(cx, cy, "Wall") == (t.tile_id in layer.tileset.enum_tag["Wall"])
+        x, y = example.levels[0].convert_coord_grid(cx, cy, layer.grid_size)
+        assert masks.has_tag_at_point(x + layer.px_total_offset_x, y + layer.px_total_offset_y, "Wall") == masks.has_tag(cx, cy, "Wall")
+
+    walls = masks.cells_with_tag("Wall")
+    assert len(walls) == masks.masks["Wall"].sum()
+    cx, cy = walls[0]
+    layer.clear_tile(cx, cy)
+    assert not masks.has_tag(cx, cy, "Wall")
+    assert masks.tags(cx, cy) == []
+    layer.set_tile(cx, cy, layer.tileset.enum_tag["Wall"][0])
+    assert masks.tags(cx, cy) == ["Wall"]
+
+    level = example.levels[0]
+    everything = arcade.LBWH(0, 0, level.width, level.height)
+    assert len(masks.cells_with_tag("Wall", everything)) == len(walls)
+    assert len(masks.cells_with_tag("Wall", arcade.LBWH(-100, -100, 10, 10))) == 0
+
+
+def test_cells_out_of_layer():
+    example = arcadeLDtk.read_LDtk("test.ldtk")
+    layer = example.levels[0].layers_by_identifier["Typeobject"]
+    masks = layer.tile_masks()
+    # the last column, which a negative index would read
+    cy = next(cy for cy in range(layer.c_height) if masks.tile_id(layer.c_width - 1, cy) != EMPTY)
+    for cx, cy in [(-1, cy), (layer.c_width, cy), (0, -1), (0, layer.c_height)]:
+        assert masks.tile_id(cx, cy) == EMPTY
+        assert not masks.has_tag(cx, cy, "Wall")
+        assert masks.tags(cx, cy) == []
+        assert masks.custom_data(cx, cy) is None
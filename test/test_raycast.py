@@ -0,0 +1,88 @@
+import math
+
+import numpy as np
+
+import arcadeLDtk
+
+
+def load():
+    world = arcadeLDtk.read_LDtk("test/samples/WorldMap_GridVania_layout.ldtk")
+    level = world.levels[0]
+    layer = level.layers_by_identifier["Collisions"]
+    return level, layer, arcadeLDtk.IntGridRaycaster(layer)
+
+
+def walk(level, layer, x, y, dx, dy, max_distance):
+    """Reference: sample the ray every 0.1 pixel"""
+    length = math.hypot(dx, dy)
+    for i in range(int(max_distance * 10)):
+        t = i / 10
+        px, py = x + dx / length * t, y + dy / length * t
+        if not level.contains_coord(px, py):
+            return None
+        cx, cy = layer.cell_at(px, py)
+        if not (0 <= cx < layer.c_width and 0 <= cy < layer.c_height):
+            return None
+        if layer.int_grid_csv[cy * layer.c_width + cx] != 0:
+            return (cx, cy)
+    return None
+
+
+def test_cast():
+    level, layer, raycaster = load()
+    rng = np.random.default_rng(0)
+    origins, directions = [], []
+    while len(origins) < 50:
+        x, y = rng.uniform(0, level.width), rng.uniform(0, level.height)
+        cx, cy = layer.cell_at(x, y)
+        if layer.int_grid_csv[cy * layer.c_width + cx] == 0:
+            origins.append((x, y))
+            directions.append(tuple(rng.uniform(-1, 1, 2)))
+
+    many = raycaster.cast_many(np.array(origins), np.array(directions), 200)
+    for i, ((x, y), (dx, dy)) in enumerate(zip(origins, directions)):
+        hit = raycaster.cast(x, y, dx, dy, 200)
+        expected = walk(level, layer, x, y, dx, dy, 200)
+        if hit is None:
+            assert not many.hit[i]
+        else:
+            assert many.hit[i]
+            assert tuple(many.cells[i]) == hit.cell
+            assert math.isclose(many.distances[i], hit.distance, abs_tol=1e-6)
+            assert np.allclose(many.points[i], hit.point)
+        if expected is not None:
+            assert hit is not None and expected == hit.cell
+
+
+def test_line_of_sight_and_fov():
+    level, layer, raycaster = load()
+    index = layer.int_grid_csv.index(0)
+    x, y = level.convert_coord_grid(index % layer.c_width, index // layer.c_width, layer.grid_size)
+    assert raycaster.line_of_sight(x, y, x, y)
+
+    polygon = raycaster.visibility_polygon(x, y, 100)
+    assert len(polygon) >= 64
+    for px, py in polygon:
+        assert math.hypot(px - x, py - y) <= 100 + 1e-6
+        assert raycaster.line_of_sight(x, y, x + (px - x) * 0.99, y + (py - y) * 0.99)
+
+    cx, cy = layer.cell_at(x, y)
+    layer.set_int_grid(cx, cy, 1)
+    assert raycaster.cast(x, y, 1, 0).cell == (cx, cy)
+
+
+def test_values_set_after_construction():
+    level, layer, raycaster = load()
+    explicit = arcadeLDtk.IntGridRaycaster(layer, blocking=[5])
+    index = layer.int_grid_csv.index(0)
+    cx, cy = index % layer.c_width, index // layer.c_width
+    x, y = level.convert_coord_grid(cx, cy, layer.grid_size)
+
+    layer.set_int_grid(cx, cy, 3)
+    assert raycaster.cast(x, y, 1, 0, 1) is not None
+    assert raycaster.cast_many(np.array([(x, y)]), np.array([(1, 0)]), 1).hit[0]
+    assert explicit.cast(x, y, 1, 0, 1) is None
+
+    layer.set_int_grid(cx, cy, 5)
+    assert explicit.cast(x, y, 1, 0, 1) is not None
+    assert explicit.cast_many(np.array([(x, y)]), np.array([(1, 0)]), 1).hit[0]
@@ -0,0 +1,46 @@
+import arcadeLDtk
+
+
+def load_layer():
+    example = arcadeLDtk.read_LDtk("test/samples/Test_file_for_API_showing_all_features.ldtk")
+    return example.levels[0].layers_by_identifier["Tiles"]
+
+
+def test_edit_tiles():
+    layer = load_layer()
+    sprites = layer.sprite_list()
+    size = len(sprites)
+    cx, cy = layer.tiles()[0].cell
+
+    assert layer.get_tile(cx, cy) is not None
+    assert layer.clear_tile(cx, cy)
+    assert layer.get_tile(cx, cy) is None
+    assert not layer.clear_tile(cx, cy)
+    assert len(sprites) == size
+
+    tile = layer.set_tile(cx, cy, 3, flip_x=True, alpha=0.5)
+    assert layer.get_tile(cx, cy) is tile
+    assert tile.cell == (cx, cy)
+    assert len(sprites) == size
+    assert all(s.visible for s in sprites)
+
+    with layer.batch_edit():
+        for x in range(layer.c_width):
+            layer.set_tile(x, layer.c_height - 1, 1)
+    assert layer.sprite_list() is sprites
+    assert layer.cell_at(*layer.sprite_list()[-1].position) == (layer.c_width - 1, layer.c_height - 1)
+    assert len(layer.tiles()) == len([s for s in layer.sprite_list(regenerate=True) if s.visible])
+
+
+def test_display_order_kept():
+    example = arcadeLDtk.read_LDtk("test/samples/AutoLayers_2_stamps.ldtk")
+    layer = next(l for level in example.levels for l in level.layers if l.has_tiles() and len(l.tiles()) > 2)
+    before = list(layer.tiles())
+    layer._cell_index()
+    assert [id(t) for t in layer.tiles()] == [id(t) for t in before]
+
+    cx, cy = before[0].cell
+    new = layer.set_tile(cx, cy, 1)
+    after = layer.tiles()
+    assert after[-1] is new
+    assert [id(t) for t in after[:-1]] == [id(t) for t in before if t.cell != (cx, cy)]
@@ -0,0 +1,59 @@
+import arcadeLDtk
+
+
+def test_world_scene():
+    world = arcadeLDtk.read_LDtk("test/samples/WorldMap_GridVania_layout.ldtk")
+    scene = world.make_world_scene()
+    nb_lists = len(scene.sprite_lists)
+    assert nb_lists <= max(len(level.layers) for level in world.levels)
+    nb_sprites = sum(len(sl) for sl in scene.sprite_lists)
+    visible = lambda: sum(s.visible for sl in scene.sprite_lists for s in sl)
+    assert visible() == nb_sprites
+
+    level = world.levels[0]
+    assert level in scene
+    scene.detach(level)
+    assert level not in scene
+    assert len(scene.sprite_lists) == nb_lists
+    assert visible() < nb_sprites
+
+    scene.attach(level)
+    assert visible() == nb_sprites
+    assert sum(len(sl) for sl in scene.sprite_lists) == nb_sprites
+
+    depth, layer = next((d, l) for d, l in enumerate(level.layers) if l.visible and l.has_tiles() and l.tiles())
+    assert layer.tileset is not None
+    tile = layer.tiles()[0]
+    sprite = scene._sprites_by_level[level.iid][(depth, layer.tileset.uid)][0]
+    cx, cy = tile.cell
+    gs = layer.grid_size
+    # ldtk world coordinates have y going down, arcade ones y going up
+    assert sprite.position == (
+        level.world_x + layer.px_total_offset_x + cx * gs + gs / 2,
+        -(level.world_y - layer.px_total_offset_y + cy * gs + gs / 2)
+    )
+
+
+def test_reattach_keeps_tile_order():
+    world = arcadeLDtk.read_LDtk("test/samples/WorldMap_GridVania_layout.ldtk")
+    scene = world.make_world_scene()
+
+    def stacked(level):
+        cells = [t.cell for l in level.layers if l.visible and l.has_tiles() for t in l.tiles()]
+        return len(cells) - len(set(cells))
+    level = max(world.levels, key=stacked)
+    assert stacked(level) > 0
+    others = [l for l in world.levels if l is not level][:2]
+
+    for other in others:
+        scene.detach(other)
+    scene.detach(level)
+    scene.attach(level)
+
+    for depth, layer in enumerate(level.layers):
+        if layer.visible and layer.has_tiles() and layer.tileset is not None:
+            key = (depth, layer.tileset.uid)
+            sprite_list = scene._sprite_lists[key]
+            indices = [sprite_list.index(s) for s in scene._sprites_by_level[level.iid][key]]
+            assert len(indices) == len(layer.tiles())
+            assert indices == sorted(indices)